@@ -1,4 +1,18 @@
+import sys
+
+# Mit --gevent muss gevent Threads, Locks und Sockets patchen, bevor
+# irgendein anderes Modul sie importiert. Jede Websocket-Verbindung ist dann
+# ein Greenlet in einer Event-Schleife statt eines eigenen OS-Threads.
+GEVENT = __name__ == '__main__' and '--gevent' in sys.argv[1:]
+if GEVENT:
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:  # pragma: no cover - optionale Abhaengigkeit
+        GEVENT = False
+
 import argparse
+import itertools
 import threading
 import asyncio
 import json
@@ -9,6 +23,8 @@ import websockets
 import logging
 from enum import Enum
 from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from flask import Flask, render_template, request, redirect, session, url_for, jsonify
 import datetime
 import time
@@ -89,11 +105,34 @@ RIG_LOCK = threading.Lock()
 OPERATORS = {}
 OPERATOR_LOCK = threading.Lock()
 RIG_VALUES = {}
+# Zeitpunkt (time.time()), zu dem der TRX jeden Wert in RIG_VALUES zuletzt
+# gelesen hat (Aenderung oder periodische Bestaetigung)
+RIG_VALUE_TIMES = {}
 VALUES_LOCK = threading.Lock()
+# Versionierter Zustand je TRX (geschuetzt durch VALUES_LOCK): jede Aenderung
+# an Werten oder Speichern erhaelt eine neue Version aus einem gemeinsamen,
+# mit der Startzeit beginnenden Zaehler, damit Versionen eines frueheren
+# Serverlaufs nie als aktuell gelten.
+STATE_VERSIONS = itertools.count(int(time.time() * 1000))
+# Rufzeichen -> deque der letzten Aenderungen (version, art, daten)
+RIG_DELTAS = {}
+# Rufzeichen -> Version, ab der RIG_DELTAS lueckenlos ist
+RIG_DELTA_FLOOR = {}
+STATUS_DELTA_LOG = 64
+# Rufzeichen -> zwischengespeicherter, fertig serialisierter Gesamtstand
+RIG_SNAPSHOTS = {}
+VALUE_COMMANDS = {'get_frequency': 'FA', 'get_mode': 'MD', 'get_smeter': 'SM'}
 RIG_MEMORIES = {}
+RIG_MEMORY_DETAILS = {}
 MEMORY_LOCK = threading.Lock()
+# Menge der StatusClient-Objekte (ein Sendepuffer je Status-Websocket)
 STATUS_CLIENTS = set()
 STATUS_LOCK = threading.Lock()
+STATUS_QUEUE_MESSAGES = 256  # danach gilt ein Client als haengend und wird getrennt
+# Wertaenderungen je Client hoechstens einmal pro Fenster (ms) senden, 0 = sofort
+STATUS_WINDOW_MS = 100
+# S-Meter-Aenderungen unterhalb dieser Schwelle (Rohwert 0-255) nicht senden
+SMETER_DEADBAND = 0
 ACTIVE_USERS = {}
 ACTIVE_LOCK = threading.Lock()
 USER_RTT = {}
@@ -103,10 +142,33 @@ USER_RIG = {}
 USER_RIG_LOCK = threading.Lock()
 RIG_AUDIO = {}
 RIG_AUDIO_LOCK = threading.Lock()
+# Rufzeichen -> Menge der AudioListener (ein Sendepuffer je Browser)
 AUDIO_CLIENTS = {}
 AUDIO_CLIENTS_LOCK = threading.Lock()
+AUDIO_QUEUE_FRAMES = 8  # ca. 0,5 s Audio je Hoerer, danach fallen alte Rahmen weg
+# Codecs, die die Weboberflaeche kodieren/dekodieren kann, in Vorzugsreihenfolge
+AUDIO_CODECS = ['adpcm', 'ulaw', 'alaw', 'pcm']
+# Pro Rufzeichen der beim Audio-Handshake ausgehandelte Codec
+RIG_AUDIO_CODECS = {}
+# Letzter Stille-Marker je Rufzeichen, solange der TRX kein Audio sendet
+RIG_AUDIO_SILENCE = {}
 RIG_LIST_CLIENTS = set()
 RIG_LIST_LOCK = threading.Lock()
+# Offene Anfragen an TRX-Dienste: Korrelations-ID -> Future der Antwort
+PENDING_REPLIES = {}
+# Korrelations-ID -> Funktion fuer Zwischenmeldungen langer Anfragen
+PROGRESS_HANDLERS = {}
+PENDING_LOCK = threading.Lock()
+REQUEST_IDS = itertools.count(1)
+RIG_REPLY_TIMEOUT = 2.0
+# Antwort-Snapshot: Wartezeit je CAT-Befehl und Fortschritt des laufenden Auftrags
+ANSWER_TIMEOUT = 0.3
+ANSWER_JOB = {'running': False, 'done': 0, 'total': 0}
+ANSWER_JOB_LOCK = threading.Lock()
+REMOTE_CONNECTION = None
+REMOTE_CONNECTION_LOCK = threading.Lock()
+REMOTE_CONNECT_TIMEOUT = 5.0
+REMOTE_RECONNECT_DELAY = 1.0
 ERLAUBTE_MODE_CODES = {f'{code:02X}' for code in range(0x01, 0x0F)}
 
 GERMAN_PREFIXES = (
@@ -219,9 +281,12 @@ def load_answer_commands():
 
 def save_answers(data):
     answers_file = os.path.join(BASE_DIR, 'docs', 'cat_answers.json')
+    tmp_file = answers_file + '.tmp'
     try:
-        with open(answers_file, 'w', encoding='utf-8') as f:
+        # Erst vollstaendig schreiben, dann ersetzen: /answers liest nie halbe Dateien
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, answers_file)
     except Exception:
         logger.exception('Failed to save answers')
 
@@ -235,53 +300,723 @@ def load_saved_answers():
         return {}
 
 
-def fetch_cat_answers():
-    """Collect answers for CAT commands and return dict."""
-    commands = load_answer_commands()
+def send_rig_request(ws, data, progress=None):
+    """Befehl mit Korrelations-ID an einen TRX senden.
+
+    Liefert ein Future, das der ``rig()``-Handler mit der Antwort erfuellt.
+    Zwischenmeldungen mit derselben ID werden an ``progress`` uebergeben.
+    """
+    req_id = next(REQUEST_IDS)
+    future = Future()
+    future.request_id = req_id
+    with PENDING_LOCK:
+        PENDING_REPLIES[req_id] = future
+        if progress is not None:
+            PROGRESS_HANDLERS[req_id] = progress
+    try:
+        ws.send(json.dumps(dict(data, id=req_id)))
+    except Exception:
+        with PENDING_LOCK:
+            PENDING_REPLIES.pop(req_id, None)
+            PROGRESS_HANDLERS.pop(req_id, None)
+        raise
+    return future
+
+
+def wait_rig_reply(future, timeout=RIG_REPLY_TIMEOUT):
+    """Auf die Antwort zu ``future`` warten, ``TimeoutError`` bei Ausbleiben."""
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        # Vor Python 3.11 nicht das eingebaute TimeoutError
+        raise TimeoutError(f'Keine Antwort auf Anfrage {future.request_id}') from None
+    finally:
+        with PENDING_LOCK:
+            PENDING_REPLIES.pop(future.request_id, None)
+            PROGRESS_HANDLERS.pop(future.request_id, None)
+
+
+def dispatch_rig_progress(data):
+    """Zwischenmeldung einer langen Anfrage an ihren Empfaenger weitergeben."""
+    with PENDING_LOCK:
+        handler = PROGRESS_HANDLERS.get(data.get('id'))
+    if handler is not None:
+        try:
+            handler(data)
+        except Exception:
+            logger.exception('Fortschrittsmeldung konnte nicht verarbeitet werden')
+
+
+def resolve_rig_reply(data):
+    """Antwort mit Korrelations-ID der wartenden Anfrage zuordnen."""
+    with PENDING_LOCK:
+        future = PENDING_REPLIES.pop(data.get('id'), None)
+    if future is not None and not future.done():
+        future.set_result(data.get('response'))
+
+
+class RemoteConnection:
+    """Dauerhafte Websocket-Verbindung zum Remote-Server.
+
+    Ein Hintergrundthread betreibt eine eigene Event-Schleife, haelt die
+    Verbindung offen und baut sie nach Abbruch neu auf. Request-Threads
+    reichen Befehle mit :meth:`submit` ein und warten auf das Ergebnis;
+    Antworten werden ueber die Korrelations-ID zugeordnet. Pro Befehl
+    faellt so nur noch ein Nachrichten-Umlauf an.
+    """
+
+    def __init__(self, uri):
+        self.uri = uri
+        self.loop = None
+        self.ws = None
+        self._connected = None
+        self._pending = {}
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Hintergrundthread bei Bedarf starten."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            ready = threading.Event()
+
+            def run():
+                self.loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self.loop)
+                self._connected = asyncio.Event()
+                ready.set()
+                self.loop.run_until_complete(self._run())
+
+            self._thread = threading.Thread(target=run, name='remote-ws',
+                                            daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    async def _run(self):
+        while True:
+            try:
+                async with websockets.connect(self.uri) as ws:
+                    self.ws = ws
+                    self._connected.set()
+                    logger.info('Remote-Verbindung zu %s hergestellt', self.uri)
+                    async for msg in ws:
+                        self._dispatch(msg)
+            except Exception as exc:
+                logger.warning('Remote-Verbindung getrennt (%s), neuer Versuch '
+                               'in %.0f s', exc, REMOTE_RECONNECT_DELAY)
+            finally:
+                self.ws = None
+                self._connected.clear()
+                pending, self._pending = self._pending, {}
+                for future in pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError('Verbindung getrennt'))
+            await asyncio.sleep(REMOTE_RECONNECT_DELAY)
+
+    def _dispatch(self, msg):
+        try:
+            data = json.loads(msg)
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        if 'progress' in data:
+            dispatch_rig_progress(data)
+            return
+        future = self._pending.pop(data.get('id'), None)
+        if future is not None and not future.done():
+            future.set_result(data.get('response'))
+
+    async def _send(self, data, wait_reply, timeout, progress):
+        await asyncio.wait_for(self._connected.wait(), REMOTE_CONNECT_TIMEOUT)
+        if not wait_reply:
+            await self.ws.send(json.dumps(data))
+            return None
+        req_id = next(REQUEST_IDS)
+        future = self.loop.create_future()
+        self._pending[req_id] = future
+        if progress is not None:
+            with PENDING_LOCK:
+                PROGRESS_HANDLERS[req_id] = progress
+        try:
+            await self.ws.send(json.dumps(dict(data, id=req_id)))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(req_id, None)
+            with PENDING_LOCK:
+                PROGRESS_HANDLERS.pop(req_id, None)
+
+    def submit(self, data, wait_reply=False, timeout=RIG_REPLY_TIMEOUT,
+               progress=None):
+        """Befehl einreihen, liefert ein ``concurrent.futures.Future``."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self._send(data, wait_reply, timeout, progress), self.loop)
+
+    def call(self, data, wait_reply=False, timeout=RIG_REPLY_TIMEOUT,
+             progress=None):
+        """Befehl senden und bei ``wait_reply`` die Antwort liefern."""
+        return self.submit(data, wait_reply, timeout, progress).result(
+            REMOTE_CONNECT_TIMEOUT + timeout)
+
+
+def get_remote_connection():
+    """Gemeinsame Verbindung zum ``REMOTE_SERVER`` liefern."""
+    global REMOTE_CONNECTION
+    with REMOTE_CONNECTION_LOCK:
+        if REMOTE_CONNECTION is None or REMOTE_CONNECTION.uri != REMOTE_SERVER:
+            REMOTE_CONNECTION = RemoteConnection(REMOTE_SERVER)
+        return REMOTE_CONNECTION
+
+
+def run_answer_snapshot(request_snapshot, commands):
+    """Antwort-Snapshot ausfuehren und ``cat_answers.json`` laufend schreiben.
+
+    ``request_snapshot(data, progress, timeout)`` sendet den Auftrag an den
+    TRX und liefert dessen Endergebnis. Jeder gemeldete Block wird sofort
+    gespeichert, damit auch ein abgebrochener Lauf Ergebnisse hinterlaesst.
+    """
     results = {}
+
+    def progress(data):
+        chunk = data.get('progress') or {}
+        with ANSWER_JOB_LOCK:
+            results.update(chunk)
+            ANSWER_JOB['done'] = data.get('done', len(results))
+            ANSWER_JOB['total'] = data.get('total', len(commands))
+            snapshot = dict(results)
+        save_answers(snapshot)
+
+    timeout = ANSWER_TIMEOUT * len(commands) + RIG_REPLY_TIMEOUT
+    try:
+        final = request_snapshot({'command': 'snapshot_answers',
+                                  'commands': commands,
+                                  'timeout': ANSWER_TIMEOUT},
+                                 progress, timeout)
+        if isinstance(final, dict):
+            with ANSWER_JOB_LOCK:
+                results.update(final)
+                ANSWER_JOB['done'] = len(results)
+            save_answers(dict(results))
+        slow = sorted(((v.get('latency_ms') or 0, k) for k, v in results.items()
+                       if isinstance(v, dict)), reverse=True)[:5]
+        logger.info('CAT-Antworten: %d/%d beantwortet, langsamste (ms): %s',
+                    sum(1 for v in results.values()
+                        if isinstance(v, dict) and v.get('answer')),
+                    len(commands), slow)
+    except Exception:
+        logger.exception('Failed to fetch answers')
+    finally:
+        with ANSWER_JOB_LOCK:
+            ANSWER_JOB['running'] = False
+
+
+def start_answer_snapshot(rig=None):
+    """Antwort-Snapshot im Hintergrund starten; False wenn nicht moeglich."""
+    commands = load_answer_commands()
     if REMOTE_SERVER:
-        async def run():
-            res = {}
-            try:
-                async with websockets.connect(REMOTE_SERVER) as ws:
-                    for cmd in commands:
-                        await ws.send(json.dumps({'command': 'cat', 'data': cmd}))
-                        try:
-                            reply = await ws.recv()
-                        except Exception:
-                            reply = ''
-                        res[cmd.strip(';')] = reply
-            except Exception:
-                logger.exception('Failed to fetch answers')
-            return res
-        results = asyncio.run(run())
-    elif RIGS:
-        rig = session.get('rig')
+        def request_snapshot(data, progress, timeout):
+            return get_remote_connection().call(data, wait_reply=True,
+                                                timeout=timeout,
+                                                progress=progress)
+    else:
         with RIG_LOCK:
             ws = RIGS.get(rig)
-        if ws:
-            for cmd in commands:
-                ws.send(json.dumps({'command': 'cat', 'data': cmd}))
-                try:
-                    reply = ws.receive()
-                except Exception:
-                    reply = ''
-                results[cmd.strip(';')] = reply
-    return results
+        if ws is None:
+            return False
+
+        def request_snapshot(data, progress, timeout):
+            future = send_rig_request(ws, dict(data, rig=rig), progress)
+            return wait_rig_reply(future, timeout)
+    with ANSWER_JOB_LOCK:
+        if ANSWER_JOB['running']:
+            return False
+        ANSWER_JOB.update(running=True, done=0, total=len(commands))
+    threading.Thread(target=run_answer_snapshot,
+                     args=(request_snapshot, commands), daemon=True).start()
+    return True
+
+
+def parse_memory_upload(value):
+    """JSON-Liste von Speicherkanaelen fuer den Sammel-Upload pruefen."""
+    try:
+        channels = json.loads(value)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(channels, list) or not all(
+            isinstance(ch, dict) and 'channel' in ch and 'frequency' in ch
+            for ch in channels):
+        return None
+    return channels
+
+
+# Kompaktes Binaerformat fuer Wertaenderungen (statt JSON), je Verbindung
+# ausgehandelt. Aufbau: Kennung, Rufzeichen (Laenge + UTF-8), Anzahl Felder,
+# je Feld: Feldnummer (255 = Name folgt), Typ und Wert. CAT-Antworten aus
+# Ziffern (``SM0123;``) werden als Stellenzahl plus Ganzzahl uebertragen.
+VALUE_FRAME_ID = 0xB1
+# Wie VALUE_FRAME_ID, nach der Kennung folgt die Zustandsversion als Varint
+VERSIONED_FRAME_ID = 0xB2
+VALUE_FIELDS = [
+    'RTT', 'FA', 'FB', 'MD', 'SM', 'BY', 'TX', 'IF', 'OI', 'RM', 'AC', 'AG',
+    'AI', 'BC', 'BI', 'BP', 'CN', 'CO', 'CS', 'CT', 'DA', 'DT', 'EX', 'FS',
+    'FT', 'GT', 'ID', 'IS', 'KM', 'KP', 'KR', 'KS', 'LK', 'LM', 'MC', 'MG',
+    'ML', 'MR', 'MS', 'MT', 'MX', 'NA', 'NB', 'NL', 'NR', 'OS', 'PA', 'PB',
+    'PC', 'PL', 'PR', 'PS', 'RA', 'RG', 'RI', 'RL', 'RS', 'RT', 'SC', 'SD',
+    'SH', 'SQ', 'TS', 'UL', 'VD', 'VG', 'VX', 'XT',
+]
+VALUE_FIELD_IDS = {name: pos for pos, name in enumerate(VALUE_FIELDS)}
+VALUE_TEXT, VALUE_DIGITS, VALUE_INT, VALUE_NONE = range(4)
+
+
+def _put_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _put_text(out, text):
+    raw = text.encode('utf-8')
+    _put_varint(out, len(raw))
+    out += raw
+
+
+def encode_value_frame(callsign, values, version=None):
+    """Wertaenderungen eines TRX als Binaerrahmen kodieren.
+
+    ``None``, wenn ein Wert weder Text noch Ganzzahl ist (dann JSON senden).
+    Mit ``version`` entsteht ein versionierter Rahmen.
+    """
+    out = bytearray((VALUE_FRAME_ID,))
+    if version is not None:
+        out[0] = VERSIONED_FRAME_ID
+        _put_varint(out, version)
+    _put_text(out, callsign or '')
+    _put_varint(out, len(values))
+    for key, value in values.items():
+        field = VALUE_FIELD_IDS.get(key)
+        if field is None:
+            out.append(255)
+            _put_text(out, key)
+        else:
+            out.append(field)
+        if value is None:
+            out.append(VALUE_NONE)
+        elif isinstance(value, bool) or not isinstance(value, (int, str)):
+            return None
+        elif isinstance(value, int):
+            out.append(VALUE_INT)
+            _put_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        else:
+            digits = value[len(key):-1]
+            if (value.startswith(key) and value.endswith(';')
+                    and 0 < len(digits) <= 15 and digits.isdigit()
+                    and digits.isascii()):
+                out.append(VALUE_DIGITS)
+                out.append(len(digits))
+                _put_varint(out, int(digits))
+            else:
+                out.append(VALUE_TEXT)
+                _put_text(out, value)
+    return bytes(out)
 
 
-def broadcast(update):
-    data = json.dumps(update)
-    log_ws('status', 'send', data)
-    remove = []
-    with STATUS_LOCK:
-        for ws in list(STATUS_CLIENTS):
+def _get_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _get_text(data, pos):
+    length, pos = _get_varint(data, pos)
+    return bytes(data[pos:pos + length]).decode('utf-8'), pos + length
+
+
+def version_value_frame(frame, version):
+    """Unversionierten Binaerrahmen (z. B. vom TRX) mit Version versehen."""
+    out = bytearray((VERSIONED_FRAME_ID,))
+    _put_varint(out, version)
+    out += frame[1:]
+    return bytes(out)
+
+
+def decode_value_frame(data):
+    """Binaerrahmen in ``(rufzeichen, werte)`` zerlegen; ``None`` bei Fehlern."""
+    try:
+        pos = 1
+        if data[0] == VERSIONED_FRAME_ID:
+            _, pos = _get_varint(data, pos)
+        elif data[0] != VALUE_FRAME_ID:
+            return None
+        callsign, pos = _get_text(data, pos)
+        count, pos = _get_varint(data, pos)
+        values = {}
+        for _ in range(count):
+            field = data[pos]
+            pos += 1
+            if field == 255:
+                key, pos = _get_text(data, pos)
+            else:
+                key = VALUE_FIELDS[field]
+            kind = data[pos]
+            pos += 1
+            if kind == VALUE_NONE:
+                value = None
+            elif kind == VALUE_INT:
+                raw, pos = _get_varint(data, pos)
+                value = -((raw + 1) >> 1) if raw & 1 else raw >> 1
+            elif kind == VALUE_DIGITS:
+                width = data[pos]
+                number, pos = _get_varint(data, pos + 1)
+                value = f'{key}{number:0{width}d};'
+            elif kind == VALUE_TEXT:
+                value, pos = _get_text(data, pos)
+            else:
+                return None
+            values[key] = value
+    except (IndexError, UnicodeDecodeError):
+        return None
+    return callsign or None, values
+
+
+def store_rig_values(callsign, values, frame=None):
+    """Neue Werte eines TRX mit Zeitstempel ablegen und verteilen.
+
+    ``frame`` ist der bereits binaer kodierte Rahmen, falls der TRX so sendet.
+    """
+    now = time.time()
+    with VALUES_LOCK:
+        RIG_VALUES.setdefault(callsign, {}).update(values)
+        times = RIG_VALUE_TIMES.setdefault(callsign, {})
+        for key in values:
+            times[key] = now
+        version = record_rig_change(callsign, 'values', dict(values))
+    if frame is not None:
+        frame = version_value_frame(frame, version)
+    broadcast({'rig': callsign, 'values': values, 'version': version}, frame)
+
+
+def record_rig_change(callsign, kind, data):
+    """Aenderung im Delta-Protokoll ablegen und ihre Version liefern.
+
+    Aufruf nur mit gehaltenem ``VALUES_LOCK``. ``kind`` ist ``'values'``
+    (geaenderte Werte) oder ``'memories'`` (Speicherliste, Detailaenderungen).
+    """
+    log = RIG_DELTAS.get(callsign)
+    if log is None:
+        log = RIG_DELTAS[callsign] = deque()
+        RIG_DELTA_FLOOR[callsign] = next(STATE_VERSIONS)
+    version = next(STATE_VERSIONS)
+    log.append((version, kind, data))
+    if len(log) > STATUS_DELTA_LOG:
+        RIG_DELTA_FLOOR[callsign] = log.popleft()[0]
+    RIG_SNAPSHOTS.pop(callsign, None)
+    return version
+
+
+def rig_snapshot(callsign):
+    """Gesamtstand eines TRX als fertig serialisierte Nachrichten liefern.
+
+    Ergebnis: ``{'version', 'json', 'binary'}`` mit je einer Liste von
+    Nachrichten, zwischengespeichert bis zur naechsten Aenderung; ``None``
+    fuer unbekannte TRX.
+    """
+    with VALUES_LOCK:
+        log = RIG_DELTAS.get(callsign)
+        if not log:
+            return None
+        version = log[-1][0]
+        cached = RIG_SNAPSHOTS.get(callsign)
+        if cached is not None and cached['version'] == version:
+            return cached
+        values = dict(RIG_VALUES.get(callsign, {}))
+    with MEMORY_LOCK:
+        memories = RIG_MEMORIES.get(callsign)
+        details = dict(RIG_MEMORY_DETAILS.get(callsign, {}))
+    snapshot = status_messages(callsign, version, values, memories, details)
+    with VALUES_LOCK:
+        log = RIG_DELTAS.get(callsign)
+        if log and log[-1][0] == version:
+            RIG_SNAPSHOTS[callsign] = snapshot
+    return snapshot
+
+
+def rig_changes_since(callsign, since):
+    """Aenderungen nach Version ``since`` zusammengefasst liefern.
+
+    ``None``, wenn das Delta-Protokoll nicht so weit zurueckreicht oder
+    ``since`` nicht zu diesem Serverlauf passt; dann ist der Gesamtstand noetig.
+    """
+    with VALUES_LOCK:
+        log = RIG_DELTAS.get(callsign)
+        if not log or not RIG_DELTA_FLOOR[callsign] <= since <= log[-1][0]:
+            return None
+        version = log[-1][0]
+        values = {}
+        memories = None
+        details = {}
+        for change, kind, data in log:
+            if change <= since:
+                continue
+            if kind == 'values':
+                values.update(data)
+            else:
+                memories = data[0]
+                details.update(data[1])
+    return status_messages(callsign, version, values, memories, details)
+
+
+def status_messages(callsign, version, values, memories, details):
+    """Werte- und Speichernachricht eines TRX in beiden Formaten erzeugen."""
+    messages = {'version': version, 'json': [], 'binary': []}
+    if values:
+        data = json.dumps({'rig': callsign, 'values': values, 'version': version})
+        frame = encode_value_frame(callsign, values, version)
+        messages['json'].append(data)
+        messages['binary'].append(data if frame is None else frame)
+    if memories is not None:
+        data = json.dumps({'rig': callsign, 'memories': memories,
+                           'memory_details': details, 'version': version})
+        messages['json'].append(data)
+        messages['binary'].append(data)
+    return messages
+
+
+def cached_rig_value(callsign, key):
+    """Zwischengespeicherten Wert und sein Alter in Sekunden liefern.
+
+    Das Alter ist die Zeit, seit der TRX den Wert zuletzt gelesen oder
+    bestaetigt hat (Aenderungsmeldung oder periodische ``confirmed``-Meldung),
+    nicht seit seiner letzten Aenderung. ``(None, None)`` wenn unbekannt.
+    """
+    with VALUES_LOCK:
+        value = RIG_VALUES.get(callsign, {}).get(key)
+        stamp = RIG_VALUE_TIMES.get(callsign, {}).get(key)
+    if value is None or stamp is None:
+        return None, None
+    return value, max(time.time() - stamp, 0.0)
+
+
+def confirm_rig_values(callsign, ages):
+    """Bestaetigung unveraenderter Werte vom TRX uebernehmen.
+
+    ``ages`` bildet Schluessel auf das Alter der Bestaetigung in ms ab.
+    Nur der Zeitstempel aendert sich, daher keine Verteilung an Clients.
+    """
+    now = time.time()
+    with VALUES_LOCK:
+        values = RIG_VALUES.get(callsign, {})
+        times = RIG_VALUE_TIMES.setdefault(callsign, {})
+        for key, age in ages.items():
+            if key in values and isinstance(age, (int, float)) and age >= 0:
+                times[key] = now - age / 1000.0
+
+
+def parse_max_age(value):
+    """``max_age`` in Sekunden lesen; ``None`` ohne Angabe, ``ValueError`` bei Unsinn."""
+    if value in (None, ''):
+        return None
+    max_age = float(value)
+    if max_age < 0:
+        raise ValueError(value)
+    return max_age
+
+
+class StatusClient:
+    """Status-Websocket mit eigenem Sendepuffer und abonnierten TRX.
+
+    ``rigs`` ist die Menge der abonnierten Rufzeichen, ``None`` bedeutet alle.
+    Statusmeldungen duerfen nicht verloren gehen; laeuft der Puffer ueber,
+    wird der Client getrennt und holt sich beim Neuaufbau den vollen Stand.
+
+    Reine Wertaenderungen werden je TRX und Feld auf den neuesten Wert
+    zusammengefasst und hoechstens einmal pro ``window`` Sekunden gesendet.
+    """
+
+    def __init__(self, ws, binary=False, rigs=None, size=STATUS_QUEUE_MESSAGES,
+                 window=None, deadband=None):
+        self.ws = ws
+        self.binary = binary
+        self.rigs = rigs
+        self.size = size
+        self.window = (STATUS_WINDOW_MS if window is None else window) / 1000.0
+        self.deadband = SMETER_DEADBAND if deadband is None else deadband
+        self.queue = deque()
+        # Rufzeichen -> zusammengefasste, noch nicht gesendete Werte
+        self.pending = {}
+        # Rufzeichen -> Version der neuesten Aenderung in ``pending``
+        self.pending_versions = {}
+        # Rufzeichen -> zuletzt angenommener S-Meter-Rohwert
+        self.smeter = {}
+        self.next_flush = 0.0
+        self.cond = threading.Condition()
+        self.closed = False
+        self.overflow = False
+        self.sent = 0
+        self.updates = 0
+        self.frames = 0
+        self.suppressed = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @property
+    def coalescing(self):
+        return self.window > 0 or self.deadband > 0
+
+    def wants(self, rig):
+        rigs = self.rigs
+        return rigs is None or rig in rigs
+
+    def put(self, msg):
+        """Nachricht einreihen; ``False`` wenn der Client nicht mehr da ist."""
+        with self.cond:
+            if self.closed:
+                return False
+            if len(self.queue) >= self.size:
+                self.overflow = True
+                self.closed = True
+                self.queue.clear()
+                self.cond.notify()
+                return False
+            self.queue.append(msg)
+            self.cond.notify()
+        return True
+
+    def put_values(self, rig, values, version=None):
+        """Wertaenderung mit noch ausstehenden Werten desselben TRX zusammenfassen."""
+        with self.cond:
+            if self.closed:
+                return False
+            self.updates += 1
+            if self.deadband and 'SM' in values:
+                level = _smeter_level(values['SM'])
+                last = self.smeter.get(rig)
+                if level is not None and last is not None and abs(level - last) < self.deadband:
+                    values = {k: v for k, v in values.items() if k != 'SM'}
+                    self.suppressed += 1
+                elif level is not None:
+                    self.smeter[rig] = level
+            if values:
+                self.pending.setdefault(rig, {}).update(values)
+                self.pending_versions[rig] = version
+                self.cond.notify()
+        return True
+
+    def _take(self):
+        """Naechste Nachrichten holen; blockiert bis etwas faellig ist."""
+        with self.cond:
+            while not self.closed:
+                if self.queue:
+                    return [self.queue.popleft()]
+                if self.pending:
+                    wait = self.next_flush - time.monotonic()
+                    if wait <= 0:
+                        pending, self.pending = self.pending, {}
+                        versions, self.pending_versions = self.pending_versions, {}
+                        self.next_flush = time.monotonic() + self.window
+                        self.frames += len(pending)
+                        break
+                    self.cond.wait(wait)
+                else:
+                    self.cond.wait()
+            else:
+                return None
+        msgs = []
+        for rig, values in pending.items():
+            version = versions.get(rig)
+            frame = encode_value_frame(rig, values, version) if self.binary else None
+            if frame is None:
+                update = {'rig': rig, 'values': values}
+                if version is not None:
+                    update['version'] = version
+                frame = json.dumps(update)
+            msgs.append(frame)
+        return msgs
+
+    def _run(self):
+        while True:
+            msgs = self._take()
+            if msgs is None:
+                break
             try:
-                ws.send(data)
+                for msg in msgs:
+                    self.ws.send(msg)
             except Exception:
-                remove.append(ws)
-        for ws in remove:
-            STATUS_CLIENTS.discard(ws)
+                self.close()
+                return
+            with self.cond:
+                self.sent += len(msgs)
+        if self.overflow:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.queue.clear()
+            self.pending.clear()
+            self.pending_versions.clear()
+            self.cond.notify()
+
+    def stats(self):
+        with self.cond:
+            return {'queued': len(self.queue), 'sent': self.sent,
+                    'overflow': self.overflow, 'updates': self.updates,
+                    'frames': self.frames, 'suppressed': self.suppressed,
+                    'ratio': round(self.updates / self.frames, 1) if self.frames else None}
+
+
+def _smeter_level(value):
+    """S-Meter-Rohwert aus ``SM0xxx;`` lesen, ``None`` wenn unlesbar."""
+    match = re.fullmatch(r'SM\d(\d{3});', value) if isinstance(value, str) else None
+    return int(match.group(1)) if match else None
+
+
+def broadcast(update, frame=None):
+    """Statusmeldung an alle Clients, die den TRX abonniert haben.
+
+    Die Nachrichten landen nur in den Sendepuffern, ``STATUS_LOCK`` wird
+    dafuer nicht gehalten. Reine Wertaenderungen fasst jeder Client selbst
+    zusammen; sonst wird jedes Format hoechstens einmal erzeugt.
+    """
+    rig = update.get('rig')
+    with STATUS_LOCK:
+        clients = [c for c in STATUS_CLIENTS if c.wants(rig)]
+    data = None
+    binary = update.keys() - {'version'} == {'rig', 'values'}
+    values_only = binary
+    gone = []
+    for client in clients:
+        if values_only and client.coalescing:
+            if not client.put_values(rig, update['values'], update.get('version')):
+                gone.append(client)
+            continue
+        payload = None
+        if binary and client.binary:
+            if frame is None:
+                frame = encode_value_frame(update['rig'], update['values'],
+                                           update.get('version'))
+                binary = frame is not None
+            payload = frame
+        if payload is None:
+            if data is None:
+                data = json.dumps(update)
+                log_ws('status', 'send', data)
+            payload = data
+        if not client.put(payload):
+            gone.append(client)
+    if gone:
+        with STATUS_LOCK:
+            STATUS_CLIENTS.difference_update(gone)
 
 
 def broadcast_active_users():
@@ -358,12 +1093,15 @@ def rig(ws):
     first = ws.receive()
     log_ws('rig', 'recv', first)
     callsign = None
+    callsigns = []
     username = None
     password = None
     mode = 'trx'
     try:
         data = json.loads(first)
         callsign = data.get('callsign')
+        # Ein TRX-Dienst kann mehrere Geraete ueber eine Verbindung melden
+        callsigns = [c for c in data.get('callsigns') or [] if c]
         username = data.get('username')
         password = data.get('password')
         mode = data.get('mode', 'trx')
@@ -384,10 +1122,15 @@ def rig(ws):
         return
     if not callsign:
         callsign = username if mode == 'trx' else f'op_{username}'
+    if callsign not in callsigns:
+        callsigns.insert(0, callsign)
 
     if mode == 'trx':
+        if 'binary' in (data.get('value_formats') or ()):
+            ws.send(json.dumps({'value_format': 'binary'}))
         with RIG_LOCK:
-            RIGS[callsign] = ws
+            for name in callsigns:
+                RIGS[name] = ws
         broadcast_rig_list()
     try:
         while True:
@@ -395,33 +1138,174 @@ def rig(ws):
             log_ws(f'rig:{callsign}', 'recv', msg)
             if msg is None:
                 break
+            if mode == 'trx' and isinstance(msg, bytes):
+                decoded = decode_value_frame(msg)
+                if decoded is None:
+                    continue
+                target, values = decoded
+                target = target or callsign
+                if target in callsigns and values:
+                    store_rig_values(target, values, msg)
+                continue
             if mode == 'trx':
                 try:
                     data = json.loads(msg)
                 except Exception:
                     continue
+                if 'id' in data and 'progress' in data:
+                    dispatch_rig_progress(data)
+                    continue
+                if 'id' in data and 'response' in data:
+                    resolve_rig_reply(data)
+                    continue
+                target = data.get('rig', callsign)
+                if target not in callsigns:
+                    continue
                 values = data.get('values')
                 if values:
-                    with VALUES_LOCK:
-                        cur = RIG_VALUES.setdefault(callsign, {})
-                        cur.update(values)
-                    broadcast({'rig': callsign, 'values': values})
+                    store_rig_values(target, values)
+                confirmed = data.get('confirmed')
+                if isinstance(confirmed, dict):
+                    confirm_rig_values(target, confirmed)
                 memories = data.get('memory_channels')
                 if memories is not None:
+                    details = data.get('memory_details') or {}
                     with MEMORY_LOCK:
-                        RIG_MEMORIES[callsign] = memories
-                    broadcast({'rig': callsign, 'memories': memories})
+                        RIG_MEMORIES[target] = memories
+                        cur = RIG_MEMORY_DETAILS.setdefault(target, {})
+                        for key, value in details.items():
+                            if value is None:
+                                cur.pop(key, None)
+                            else:
+                                cur[key] = value
+                    with VALUES_LOCK:
+                        version = record_rig_change(target, 'memories',
+                                                    (memories, dict(details)))
+                    update = {'rig': target, 'memories': memories}
+                    if details:
+                        update['memory_details'] = details
+                    update['version'] = version
+                    broadcast(update)
     finally:
         log_ws(f'rig:{callsign}', 'close', '')
         if mode == 'trx':
+            removed = False
             with RIG_LOCK:
-                if RIGS.get(callsign) is ws:
-                    del RIGS[callsign]
-                    broadcast_rig_list()
+                for name in callsigns:
+                    if RIGS.get(name) is ws:
+                        del RIGS[name]
+                        removed = True
+            if removed:
+                broadcast_rig_list()
             with VALUES_LOCK:
-                RIG_VALUES.pop(callsign, None)
+                for name in callsigns:
+                    RIG_VALUES.pop(name, None)
+                    RIG_VALUE_TIMES.pop(name, None)
+                    RIG_DELTAS.pop(name, None)
+                    RIG_DELTA_FLOOR.pop(name, None)
+                    RIG_SNAPSHOTS.pop(name, None)
             with MEMORY_LOCK:
-                RIG_MEMORIES.pop(callsign, None)
+                for name in callsigns:
+                    RIG_MEMORIES.pop(name, None)
+                    RIG_MEMORY_DETAILS.pop(name, None)
+
+
+def blocking_call(func, *args):
+    """Blockierenden C-Aufruf (PyAudio) ausfuehren, ohne gevent anzuhalten."""
+    if GEVENT:
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+
+def select_audio_codec(offered):
+    """Ersten vom TRX angebotenen Codec waehlen, den auch der Browser kann."""
+    for name in AUDIO_CODECS:
+        if name in (offered or ()):
+            return name
+    return 'pcm'
+
+
+class AudioListener:
+    """Begrenzter Sendepuffer mit eigenem Schreib-Thread fuer einen Hoerer.
+
+    ``put`` blockiert nie: Ist der Puffer voll, faellt der aelteste
+    Audiorahmen weg. Textnachrichten (Codec, Stille-Marker) werden nicht
+    verworfen. Ein langsamer Hoerer bremst so weder andere noch den TRX.
+    """
+
+    def __init__(self, ws, name, size=AUDIO_QUEUE_FRAMES):
+        self.ws = ws
+        self.name = name
+        self.size = size
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, msg):
+        """Nachricht einreihen; ``False`` wenn der Hoerer nicht mehr da ist."""
+        with self.cond:
+            if self.closed:
+                return False
+            if len(self.queue) >= self.size:
+                for pos, (_, item) in enumerate(self.queue):
+                    if isinstance(item, bytes):
+                        del self.queue[pos]
+                        self.dropped += 1
+                        break
+            self.queue.append((time.monotonic(), msg))
+            self.cond.notify()
+        return True
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                queued, msg = self.queue.popleft()
+            try:
+                self.ws.send(msg)
+            except Exception:
+                self.close()
+                return
+            # Verzoegerung zwischen Eingang vom TRX und Versand an den Hoerer
+            lag = time.monotonic() - queued
+            with self.cond:
+                self.sent += 1
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.queue.clear()
+            self.cond.notify()
+
+    def stats(self):
+        with self.cond:
+            return {'queued': len(self.queue), 'sent': self.sent,
+                    'dropped': self.dropped,
+                    'lag_ms': round(self.last_lag * 1000, 1),
+                    'max_lag_ms': round(self.max_lag * 1000, 1)}
+
+
+def fan_out_audio(callsign, msg):
+    """Audiorahmen oder Marker an alle Hoerer eines TRX verteilen."""
+    with AUDIO_CLIENTS_LOCK:
+        listeners = list(AUDIO_CLIENTS.get(callsign, set()))
+    gone = [listener for listener in listeners if not listener.put(msg)]
+    if gone:
+        with AUDIO_CLIENTS_LOCK:
+            for listener in gone:
+                AUDIO_CLIENTS.get(callsign, set()).discard(listener)
 
 
 @sock.route('/ws/rig_audio')
@@ -447,29 +1331,42 @@ def rig_audio(ws):
         return
     if not callsign:
         callsign = username
+    codec = select_audio_codec(data.get('codecs'))
+    if data.get('codecs'):
+        # Aeltere TRX-Dienste bieten nichts an und senden weiter PCM
+        ws.send(json.dumps({'codec': codec}))
     with RIG_AUDIO_LOCK:
         RIG_AUDIO[callsign] = ws
+        RIG_AUDIO_CODECS[callsign] = codec
+    # Bereits verbundene Hoerer auf den (evtl. neuen) Codec umstellen
+    fan_out_audio(callsign, json.dumps({'codec': codec}))
     try:
         while True:
             msg = ws.receive()
             if msg is None:
                 break
-            remove = []
-            with AUDIO_CLIENTS_LOCK:
-                clients = list(AUDIO_CLIENTS.get(callsign, set()))
-            for c in clients:
+            if isinstance(msg, str):
                 try:
-                    c.send(msg)
-                except Exception:
-                    remove.append(c)
-            if remove:
-                with AUDIO_CLIENTS_LOCK:
-                    for c in remove:
-                        AUDIO_CLIENTS.get(callsign, set()).discard(c)
+                    marker = json.loads(msg)
+                except ValueError:
+                    continue
+                if not isinstance(marker, dict) or not marker.get('silence'):
+                    continue
+                # Stille-Marker merken, damit spaeter verbundene Hoerer
+                # ebenfalls Komfortrauschen erzeugen
+                with RIG_AUDIO_LOCK:
+                    RIG_AUDIO_SILENCE[callsign] = msg
+            else:
+                with RIG_AUDIO_LOCK:
+                    RIG_AUDIO_SILENCE.pop(callsign, None)
+            # Rahmen kommt bereits kodiert vom TRX und geht unveraendert an alle
+            fan_out_audio(callsign, msg)
     finally:
         with RIG_AUDIO_LOCK:
             if RIG_AUDIO.get(callsign) is ws:
                 del RIG_AUDIO[callsign]
+                RIG_AUDIO_CODECS.pop(callsign, None)
+                RIG_AUDIO_SILENCE.pop(callsign, None)
         log_ws(f'rig_audio:{callsign}', 'close', '')
 
 @app.route('/')
@@ -496,6 +1393,7 @@ def index():
         operator = OPERATORS.get(selected)
     with MEMORY_LOCK:
         memories = RIG_MEMORIES.get(selected, [])
+        memory_details = dict(RIG_MEMORY_DETAILS.get(selected, {}))
     operator_status = None
     if operator:
         with USERS_LOCK:
@@ -522,6 +1420,7 @@ def index():
         user=user, role=role,
         approved=approved, unapproved_count=unapproved_count,
         active_users=active_users, memories=memories,
+        memory_details=memory_details,
         year=CURRENT_YEAR, program_version=PROGRAM_VERSION)
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -858,6 +1757,7 @@ def status_info():
         operator = OPERATORS.get(selected)
     with MEMORY_LOCK:
         memories = RIG_MEMORIES.get(selected, [])
+        memory_details = dict(RIG_MEMORY_DETAILS.get(selected, {}))
     operator_status = None
     if operator:
         with USERS_LOCK:
@@ -872,7 +1772,8 @@ def status_info():
         'selected': selected,
         'operator': operator,
         'operator_status': operator_status,
-        'memories': memories
+        'memories': memories,
+        'memory_details': memory_details
     })
 
 
@@ -882,7 +1783,9 @@ def show_answers():
         return redirect(url_for('login'))
     role = session.get('role')
     answers = load_saved_answers()
-    return render_template('answers.html', answers=answers, role=role,
+    with ANSWER_JOB_LOCK:
+        job = dict(ANSWER_JOB)
+    return render_template('answers.html', answers=answers, role=role, job=job,
                            year=CURRENT_YEAR, program_version=PROGRAM_VERSION)
 
 
@@ -892,8 +1795,7 @@ def fetch_answers_route():
         return redirect(url_for('login'))
     if session.get('role') != 'admin':
         return redirect(url_for('index'))
-    answers = fetch_cat_answers()
-    save_answers(answers)
+    start_answer_snapshot(session.get('rig'))
     return redirect(url_for('show_answers'))
 
 
@@ -989,6 +1891,11 @@ def command():
                 data = {'command': 'cat', 'data': f'MC{ch:03d};'}
             except ValueError:
                 return ('', 204)
+        elif cmd == 'upload_memories':
+            channels = parse_memory_upload(value)
+            if channels is None:
+                return ('Ungültige Speicherliste.', 400)
+            data = {'command': 'upload_memories', 'channels': channels}
         elif cmd == 'cat':
             if not value.endswith(';'):
                 value += ';'
@@ -1002,17 +1909,18 @@ def command():
         else:
             return ('', 204)
 
-        async def send():
+        def send():
             try:
-                async with websockets.connect(REMOTE_SERVER) as ws:
-                    await ws.send(json.dumps(data))
-                    if cmd in ('get_frequency', 'get_mode', 'get_smeter'):
-                        return (RemoteSendStatus.RESPONSE_RECEIVED, await ws.recv())
-                    return (RemoteSendStatus.SENT_NO_RESPONSE, None)
+                if cmd in VALUE_COMMANDS:
+                    reply = get_remote_connection().call(data, wait_reply=True)
+                    return (RemoteSendStatus.RESPONSE_RECEIVED,
+                            json.dumps({'response': reply}))
+                get_remote_connection().call(data)
+                return (RemoteSendStatus.SENT_NO_RESPONSE, None)
             except Exception:
                 logger.exception('Remote command failed')
                 return (RemoteSendStatus.ERROR, None)
-        status, resp = asyncio.run(send())
+        status, resp = send()
         if status == RemoteSendStatus.RESPONSE_RECEIVED:
             return resp
         if status == RemoteSendStatus.SENT_NO_RESPONSE:
@@ -1024,6 +1932,32 @@ def command():
             ws = RIGS.get(rig)
         if not ws:
             return ('', 204)
+        key = VALUE_COMMANDS.get(cmd)
+        if key:
+            # Lesezugriffe aus dem Zwischenspeicher, der TRX nur bei zu altem Wert
+            try:
+                max_age = parse_max_age(
+                    request.form.get('max_age', request.args.get('max_age')))
+            except ValueError:
+                return ('Ungültiges max_age.', 400)
+            cached, age = cached_rig_value(rig, key)
+            if cached is not None and (max_age is None or age <= max_age):
+                return jsonify({'response': cached, 'age': round(age, 3)})
+            try:
+                future = send_rig_request(
+                    ws, {'command': 'cat', 'data': f'{key};', 'rig': rig})
+                resp = wait_rig_reply(future)
+            except TimeoutError:
+                logger.warning('Keine Antwort vom TRX %s auf %s', rig, cmd)
+                if cached is not None:
+                    return jsonify({'response': cached, 'age': round(age, 3)})
+                return ('Keine Antwort vom TRX', 504)
+            except Exception:
+                logger.exception('Senden an TRX fehlgeschlagen')
+                return ('Kein TRX verbunden', 200)
+            if resp:
+                store_rig_values(rig, {key: resp})
+            return jsonify({'response': resp, 'age': 0.0})
         data = {'command': None}
         if cmd == 'frequency':
             try:
@@ -1081,19 +2015,19 @@ def command():
                 data = {'command': 'cat', 'data': f'MC{ch:03d};'}
             except ValueError:
                 return ('', 204)
+        elif cmd == 'upload_memories':
+            channels = parse_memory_upload(value)
+            if channels is None:
+                return ('Ungültige Speicherliste.', 400)
+            data = {'command': 'upload_memories', 'channels': channels}
         elif cmd == 'cat':
             if not value.endswith(';'):
                 value += ';'
             data = {'command': 'cat', 'data': value}
-        elif cmd == 'get_frequency':
-            data = {'command': 'get_frequency'}
-        elif cmd == 'get_mode':
-            data = {'command': 'get_mode'}
-        elif cmd == 'get_smeter':
-            data = {'command': 'get_smeter'}
         else:
             return ('', 204)
 
+        data['rig'] = rig
         try:
             ws.send(json.dumps(data))
         except Exception:
@@ -1102,18 +2036,6 @@ def command():
                 if RIGS.get(rig) is ws:
                     RIGS.pop(rig, None)
             return ('Kein TRX verbunden', 200)
-
-        if cmd in ('get_frequency', 'get_mode', 'get_smeter'):
-            try:
-                resp = ws.receive()
-            except Exception:
-                logger.exception('Empfang vom TRX fehlgeschlagen')
-                with RIG_LOCK:
-                    if RIGS.get(rig) is ws:
-                        RIGS.pop(rig, None)
-                return ('Kein TRX verbunden', 200)
-            if resp:
-                return resp
     else:
         return ('Kein TRX verbunden', 200)
     return ('', 204)
@@ -1123,18 +2045,28 @@ def audio(ws):
     rig = session.get('rig')
     rig_ws = None
     log_ws('audio', 'connect', f'rig={rig}')
+    codec = 'pcm'
+    silence = None
     if rig:
         with RIG_AUDIO_LOCK:
             rig_ws = RIG_AUDIO.get(rig)
+            codec = RIG_AUDIO_CODECS.get(rig, 'pcm')
+            silence = RIG_AUDIO_SILENCE.get(rig)
+    # Browser erst ueber den Codec informieren, dann Audio senden
+    ws.send(json.dumps({'codec': codec}))
+    if silence:
+        ws.send(silence)
     if rig_ws is not None:
+        listener = AudioListener(ws, session.get('user'))
         with AUDIO_CLIENTS_LOCK:
-            clients = AUDIO_CLIENTS.setdefault(rig, set())
-            clients.add(ws)
+            AUDIO_CLIENTS.setdefault(rig, set()).add(listener)
         try:
             while True:
                 msg = ws.receive()
                 if msg is None:
                     break
+                if isinstance(msg, str):
+                    continue
                 allow = False
                 user = session.get('user')
                 if rig and user:
@@ -1147,7 +2079,10 @@ def audio(ws):
                         break
         finally:
             with AUDIO_CLIENTS_LOCK:
-                AUDIO_CLIENTS.get(rig, set()).discard(ws)
+                AUDIO_CLIENTS.get(rig, set()).discard(listener)
+            listener.close()
+            logger.info('Audio listener %s on %s: %s', listener.name, rig,
+                        listener.stats())
     else:
         if pyaudio is None:
             ws.close()
@@ -1163,7 +2098,7 @@ def audio(ws):
 
         def send_audio():
             while running:
-                data = input_stream.read(CHUNK, exception_on_overflow=False)
+                data = blocking_call(input_stream.read, CHUNK, False)
                 try:
                     ws.send(data)
                 except Exception:
@@ -1177,7 +2112,9 @@ def audio(ws):
                 msg = ws.receive()
                 if msg is None:
                     break
-                output_stream.write(msg)
+                if isinstance(msg, str):
+                    continue
+                blocking_call(output_stream.write, msg)
         except Exception:
             logger.exception('Audio websocket error')
         finally:
@@ -1189,35 +2126,101 @@ def audio(ws):
 
 @sock.route('/ws/status')
 def status(ws):
+    # ?format=binary: Wertaenderungen als Binaerrahmen statt JSON
+    binary = request.args.get('format') == 'binary'
+    # ?rig=...: nur diese TRX abonnieren (mehrfach moeglich); ohne Angabe alle
+    rigs = None
+    if 'rig' in request.args:
+        rigs = {r for r in request.args.getlist('rig') if r}
+    # ?since=RUFZEICHEN:VERSION: nach Neuaufbau nur die fehlenden Aenderungen
+    since = parse_status_since(request.args.getlist('since'))
+    client = StatusClient(ws, binary, rigs)
     with STATUS_LOCK:
-        STATUS_CLIENTS.add(ws)
+        STATUS_CLIENTS.add(client)
     log_ws('status', 'connect', '')
-    with VALUES_LOCK:
-        for rig, vals in RIG_VALUES.items():
-            try:
-                data = json.dumps({'rig': rig, 'values': vals})
-                ws.send(data)
-                log_ws('status', 'send', data)
-            except Exception:
-                pass
-    with MEMORY_LOCK:
-        for rig, mem in RIG_MEMORIES.items():
-            try:
-                data = json.dumps({'rig': rig, 'memories': mem})
-                ws.send(data)
-                log_ws('status', 'send', data)
-            except Exception:
-                pass
+    send_status_snapshot(client, since=since)
     try:
         while True:
             msg = ws.receive()
             if msg is None:
                 break
             log_ws('status', 'recv', msg)
+            try:
+                data = json.loads(msg)
+            except (TypeError, ValueError):
+                continue
+            if isinstance(data, dict) and 'subscribe' in data:
+                # {"subscribe": [...]} ersetzt das Abo, null abonniert alle TRX
+                wanted = data['subscribe']
+                if wanted is not None:
+                    if not isinstance(wanted, list):
+                        continue
+                    wanted = {str(r) for r in wanted if r}
+                # optional {"since": {"RUFZEICHEN": VERSION}} wie bei ?since=
+                since = data.get('since')
+                if not isinstance(since, dict):
+                    since = {}
+                since = {str(rig): version for rig, version in since.items()
+                         if type(version) is int and version >= 0}
+                with STATUS_LOCK:
+                    old = client.rigs
+                    client.rigs = wanted
+                # Stand nur fuer neu hinzugekommene TRX nachliefern
+                if old is not None and (wanted is None or wanted - old):
+                    send_status_snapshot(client, None if wanted is None else wanted - old,
+                                         since)
     finally:
         with STATUS_LOCK:
-            STATUS_CLIENTS.discard(ws)
-    log_ws('status', 'close', '')
+            STATUS_CLIENTS.discard(client)
+        client.close()
+    stats = client.stats()
+    log_ws('status', 'close', json.dumps(stats))
+    logger.info('Status client: %s', stats)
+
+
+def parse_status_since(items):
+    """``RUFZEICHEN:VERSION``-Angaben in ein Dict wandeln, Unsinn ignorieren."""
+    since = {}
+    for item in items:
+        rig, _, version = str(item).rpartition(':')
+        if rig and version.isdigit():
+            since[rig] = int(version)
+    return since
+
+
+def send_status_snapshot(client, rigs=None, since=None):
+    """Aktuellen Stand der abonnierten TRX in den Sendepuffer legen.
+
+    ``rigs`` grenzt zusaetzlich ein, etwa auf neu abonnierte TRX. Nennt
+    ``since`` fuer einen TRX die zuletzt gesehene Version, gehen nur die
+    fehlenden Aenderungen raus, solange das Delta-Protokoll reicht; sonst der
+    zwischengespeicherte Gesamtstand.
+    """
+    def wanted(rig):
+        return client.wants(rig) and (rigs is None or rig in rigs)
+
+    since = since or {}
+    kind = 'binary' if client.binary else 'json'
+    with VALUES_LOCK:
+        known = [rig for rig in RIG_DELTAS if wanted(rig)]
+    for rig in known:
+        messages = None
+        if rig in since:
+            messages = rig_changes_since(rig, since[rig])
+        mode = 'delta' if messages is not None else 'snapshot'
+        if messages is None:
+            messages = rig_snapshot(rig)
+            if messages is None:
+                continue
+        for msg in messages[kind]:
+            client.put(msg)
+        # Aenderungen, die waehrenddessen schon verteilt wurden, koennen vor
+        # dem Stand im Puffer liegen; sie werden daher erneut nachgereicht.
+        later = rig_changes_since(rig, messages['version'])
+        if later is not None:
+            for msg in later[kind]:
+                client.put(msg)
+        log_ws('status', mode, f"{rig} {since.get(rig)} -> {messages['version']}")
 
 
 @sock.route('/ws/active_users')
@@ -1274,7 +2277,7 @@ def rig_list_ws(ws):
     log_ws('rig_list', 'close', '')
 
 def main():
-    global REMOTE_SERVER
+    global REMOTE_SERVER, AUDIO_CODECS, STATUS_WINDOW_MS, SMETER_DEADBAND
     parser = argparse.ArgumentParser(description='FT-991A remote server')
     parser.add_argument('--server', default=DEFAULT_REMOTE_SERVER,
                         help='Remote control server wss://host:port')
@@ -1286,10 +2289,25 @@ def main():
                         help='Audio output device index')
     parser.add_argument('--list-devices', action='store_true',
                         help='List audio devices and exit')
+    parser.add_argument('--gevent', action='store_true',
+                        help='Serve with gevent (one event loop, greenlets '
+                             'instead of one thread per websocket)')
+    parser.add_argument('--status-window', type=int, default=STATUS_WINDOW_MS,
+                        help='Merge value updates per status client and send at most '
+                             'one frame every N ms (0 = send immediately)')
+    parser.add_argument('--smeter-deadband', type=int, default=SMETER_DEADBAND,
+                        help='Do not send S-meter changes smaller than N (raw 0-255)')
+    parser.add_argument('--audio-codec', action='append', choices=AUDIO_CODECS,
+                        help='Allowed audio codec, repeatable in order of '
+                             'preference (default: adpcm, ulaw, alaw, pcm)')
     args = parser.parse_args()
     global INPUT_DEVICE_INDEX, OUTPUT_DEVICE_INDEX
     INPUT_DEVICE_INDEX = args.input_device
     OUTPUT_DEVICE_INDEX = args.output_device
+    if args.audio_codec:
+        AUDIO_CODECS = args.audio_codec
+    STATUS_WINDOW_MS = max(args.status_window, 0)
+    SMETER_DEADBAND = max(args.smeter_deadband, 0)
 
     if args.list_devices:
         if pyaudio is None:
@@ -1322,8 +2340,18 @@ def main():
     app.secret_key = configured_secret
 
     REMOTE_SERVER = args.server
+    if REMOTE_SERVER:
+        # Verbindung schon vor dem ersten Befehl aufbauen
+        get_remote_connection().start()
     # The web interface always runs on port 8084
-    app.run(host='0.0.0.0', port=8084)
+    if GEVENT:
+        from gevent.pywsgi import WSGIServer
+        logger.info('Serving with gevent on port 8084')
+        WSGIServer(('0.0.0.0', 8084), app).serve_forever()
+    else:
+        if args.gevent:
+            logger.warning('gevent not installed, using threaded server')
+        app.run(host='0.0.0.0', port=8084)
 
 
 if __name__ == '__main__':
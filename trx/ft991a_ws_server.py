@@ -1,5 +1,6 @@
 import argparse
 import asyncio
+import itertools
 import json
 import serial
 from serial import SerialException
@@ -7,11 +8,34 @@ import websockets
 from websockets.legacy.client import Connect
 import logging
 import os
+import queue
+import struct
 import subprocess
+import sys
+import threading
+import time
+import warnings
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+try:
+    from serial.tools import list_ports
+except ImportError:  # pragma: no cover
+    list_ports = None
 try:
     import pyaudio
 except ImportError:  # pragma: no cover
     pyaudio = None
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import audioop
+except ImportError:  # pragma: no cover - ab Python 3.13 nur via audioop-lts
+    audioop = None
+try:
+    import opuslib
+except Exception:  # pragma: no cover - optionale Abhaengigkeit (libopus)
+    opuslib = None
 
 DEFAULT_SERIAL_PORT = 'COM3'
 DEFAULT_BAUDRATE = 9600
@@ -22,6 +46,18 @@ AUDIO_RATE = 16000
 AUDIO_FORMAT = pyaudio.paInt16 if pyaudio else 8
 CHANNELS = 1
 CHUNK = 1024
+# Codecs in Vorzugsreihenfolge; der Server waehlt beim Audio-Handshake
+AUDIO_CODEC_PREFERENCE = ('opus', 'adpcm', 'ulaw', 'alaw', 'pcm')
+AUDIO_NEGOTIATE_TIMEOUT = 2.0  # Wartezeit auf die Codec-Auswahl des Servers
+OPUS_FRAME = 320               # 20 ms bei 16 kHz
+AUDIO_RING_BYTES = CHUNK * 2 * 16  # ca. 1 s Puffer je Richtung
+AUDIO_STATS_INTERVAL = 60.0
+JITTER_TARGET_MS = 100   # Grundverzoegerung des TX-Jitterpuffers
+JITTER_MAX_MS = 500      # Obergrenze der adaptiven Verzoegerung
+JITTER_FACTOR = 3.0      # Zielverzoegerung = Rahmendauer + Faktor * Jitter
+JITTER_REPEATS = 1       # Fehlende Rahmen so oft gedaempft wiederholen
+VAD_THRESHOLD = 0        # RMS-Schwelle der Pausenunterdrueckung (0 = aus)
+VAD_HANGOVER = 0.5       # Sekunden, die die Sperre nach Signalende offen bleibt
 BAUDRATES = [4800, 9600, 19200, 38400, 57600, 115200]
 ERLAUBTE_MODE_CODES = {f'{code:02X}' for code in range(0x01, 0x0F)}
 
@@ -62,6 +98,8 @@ def ws_connect(uri: str, **kwargs):
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LOG_FILE = os.path.join(BASE_DIR, 'error.log')
+MEMORY_CACHE_FILE = os.path.join(BASE_DIR, 'memory_cache.json')
+CONFIG_FILE = os.path.join(BASE_DIR, 'config.json')
 
 
 def _get_github_version():
@@ -88,13 +126,61 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-ser = None
-ser_lock = asyncio.Lock()
-CALLSIGN = DEFAULT_CALLSIGN
 SERIAL_POLLING = 0.2  # seconds
-LAST_FREQUENCY = None
-LAST_VALUES = {}
-MEMORY_CHANNELS = []
+# So oft meldet der TRX dem Server, welche Werte er zuletzt bestaetigt hat
+VALUE_CONFIRM_INTERVAL = 1.0
+# Anteil eines Pollzyklus, der fuer serielle Abfragen verplant werden darf.
+# Der Rest bleibt fuer Operator-Befehle frei.
+POLL_BUDGET_SHARE = 0.75
+CAT_BITS_PER_BYTE = 10   # 8N1 inkl. Start- und Stoppbit
+CAT_REPLY_BYTES = 12     # angenommene Antwortlaenge ohne Messwert
+CAT_TURNAROUND = 0.01    # Bearbeitungszeit des TRX pro Befehl in Sekunden
+# Prioritaetsstufen: Befehle und Abfrageintervall in Sekunden. ``None`` bei
+# den Befehlen bedeutet "alle uebrigen".
+POLL_TIERS = (
+    ('fast', {'FA', 'SM', 'TX', 'MD'}, SERIAL_POLLING),
+    ('slow', {'AG', 'BC', 'BP', 'CO', 'FB', 'GT', 'IS', 'NA', 'NB', 'NL',
+              'NR', 'PA', 'PC', 'RA', 'RG', 'RL', 'SH', 'SQ'}, 2.0),
+    ('rare', None, 30.0),
+)
+# Befehle ohne Antwort nach so vielen Versuchen nur noch selten abfragen
+POLL_SILENT_AFTER = 3
+POLL_SILENT_INTERVAL = 300.0
+POLL_STATS_INTERVAL = 60.0
+# Auto-Information: TRX meldet Aenderungen selbststaendig (AI1;)
+AUTO_INFO = False
+AUTO_INFO_IDLE = 0.02  # Wartezeit bei leerem Empfangspuffer in Sekunden
+CAT_TIMEOUT = 0.3           # Wartezeit auf weitere Antworten in Sekunden
+CAT_MAX_WAIT = 1.0          # Obergrenze einer Abfrage, auch bei laufendem Empfang
+CAT_BUFFER_LIMIT = 256      # Bytes ohne Rahmenende, danach gilt der Puffer als Muell
+UNSOLICITED_LIMIT = 256     # unaufgeforderte Rahmen, bis der AI-Leser sie abholt
+SERIAL_READ_TIMEOUT = 0.05  # Timeout eines einzelnen seriellen Lesevorgangs
+SERIAL_STOP_TIMEOUT = 2.0   # Wartezeit auf laufende Seriell-Auftraege beim Beenden
+MEMORY_SCAN_CHUNK = 4       # MR-Abfragen pro Schreibvorgang
+STARTUP_CHUNK = 4           # Starttest-Abfragen pro Schreibvorgang
+POLL_CHUNK = 1              # Pollabfragen pro Auftrag, danach Vorrang pruefen
+SNAPSHOT_CHUNK = 8          # Abfragen pro Schreibvorgang beim Antwort-Snapshot
+SNAPSHOT_TIMEOUT = 0.3      # Wartezeit je Befehl beim Antwort-Snapshot
+# Prioritaeten der Seriell-Auftraege (kleiner = wichtiger)
+PRIORITY_PTT = 0
+PRIORITY_OPERATOR = 1
+PRIORITY_POLL = 2
+PRIORITY_BACKGROUND = 3
+# Fester Frequenzschritt eines Encoder-Befehls (EU;/ED;) beim Zusammenfassen;
+# None = Schritt je Betriebsart am TRX beobachten
+ENCODER_STEP_HZ = None
+# So lange nach einem einzelnen EU;/ED; gilt eine FA-Aenderung als dessen Folge
+ENCODER_OBSERVE_TIME = 2.0
+# So lange gilt die zuletzt geschriebene Frequenz als Basis fuer Encoder-Schritte
+TUNING_HOLD = 1.0
+MEMORY_COUNT = 125
+MEMORY_TAG_LENGTH = 12
+# Suche nach dem TRX: Antwortzeit je Port/Baudrate und Kennung des FT-991A
+PROBE_TIMEOUT = 0.15
+PROBE_MAX_WAIT = 0.4  # Obergrenze je Baudrate, auch wenn das Geraet weitersendet
+RIG_ID = '0670'
+# Wartezeit zwischen zwei Suchlaeufen nach Verlust der seriellen Verbindung
+RECONNECT_INTERVAL = 2.0
 
 
 class DummySerial:
@@ -103,13 +189,21 @@ class DummySerial:
     Dieses Dummy-Geraet speichert intern Frequenz, Modus und PTT-Status und
     liefert auf einfache CAT-Befehle plausible Antworten. So kann der
     Websocket-Server auch ohne angeschlossenes Funkgeraet getestet werden.
+    Die Antworten werden wie beim echten Geraet als ``;``-gerahmter
+    Bytestrom bereitgestellt.
     """
 
+    baudrate = DEFAULT_BAUDRATE
+    port = 'dummy'
+
     def __init__(self):
         self.frequency = 7100000  # 7.100 MHz als Startfrequenz
         self.mode_code = '01'     # LSB
         self.ptt = False
-        self._responses = []
+        self.auto_info = False
+        self.timeout = SERIAL_READ_TIMEOUT
+        self._rx = bytearray()
+        self.memory_tags = {}
         # Einige vordefinierte Speicherkanaele
         self.memories = {
             0: (145500000, '04'),  # 145.500 MHz FM
@@ -117,6 +211,10 @@ class DummySerial:
             2: (144800000, '02'),  # 144.800 MHz USB
         }
 
+    def _reply(self, frame):
+        """Antwortrahmen in den Empfangspuffer stellen."""
+        self._rx.extend(frame.encode('ascii'))
+
     def write(self, data):
         """Verarbeite eingehende CAT-Befehle."""
         if isinstance(data, bytes):
@@ -126,21 +224,37 @@ class DummySerial:
                 continue
             if cmd.startswith('FA'):
                 if len(cmd) == 2:
-                    self._responses.append(f'{self.frequency:011d};'.encode('ascii'))
+                    self._reply(f'FA{self.frequency:011d};')
                 else:
                     try:
                         self.frequency = int(cmd[2:])
                     except ValueError:
                         pass
+                    else:
+                        self._auto_info(f'FA{self.frequency:011d};')
             elif cmd.startswith('MD'):
                 if len(cmd) == 2:
-                    self._responses.append(f'MD{self.mode_code};'.encode('ascii'))
+                    self._reply(f'MD{self.mode_code};')
                 else:
                     mode_code = normalize_mode_code(cmd[2:])
                     if mode_code is not None:
                         self.mode_code = mode_code
+                        self._auto_info(f'MD{self.mode_code};')
+            elif cmd.startswith('AI'):
+                if len(cmd) == 2:
+                    self._reply(f'AI{int(self.auto_info)};')
+                else:
+                    self.auto_info = cmd[2:] == '1'
             elif cmd == 'SM':
-                self._responses.append(b'0050;')
+                self._reply('SM0050;')
+            elif cmd in ('EU', 'ED'):
+                # Einen Rasterschritt weiter, Startfrequenz neben dem Raster rastet ein
+                step = 12500 if self.mode_code == '04' else 10
+                if cmd == 'EU':
+                    self.frequency = (self.frequency // step + 1) * step
+                else:
+                    self.frequency = -(-self.frequency // step - 1) * step
+                self._auto_info(f'FA{self.frequency:011d};')
             elif cmd.startswith('MR'):
                 try:
                     idx = int(cmd[2:5])
@@ -148,10 +262,29 @@ class DummySerial:
                     idx = None
                 if idx is not None and idx in self.memories:
                     freq, mode_code = self.memories[idx]
-                    self._responses.append(
-                        f'FA{freq:011d};MD{mode_code};'.encode('ascii'))
+                    self._reply(
+                        f'MR{idx:03d}{freq:09d}+000000{mode_code[1]}10000;')
                 else:
-                    self._responses.append(b'0')  # Speicher leer
+                    self._reply('?;')  # Speicher leer
+            elif cmd.startswith('MT'):
+                try:
+                    idx = int(cmd[2:5])
+                except ValueError:
+                    self._reply('?;')
+                    continue
+                if len(cmd) == 5:
+                    if idx in self.memories:
+                        freq, mode_code = self.memories[idx]
+                        tag = self.memory_tags.get(idx, '')
+                        self._reply(f'MT{idx:03d}{freq:09d}+000000{mode_code[1]}'
+                                    f'10000{tag:<{MEMORY_TAG_LENGTH}};')
+                    else:
+                        self._reply('?;')
+                else:
+                    channel = parse_memory_reply(cmd)
+                    if channel is not None:
+                        self.memories[idx] = (channel['frequency'], channel['mode'])
+                        self.memory_tags[idx] = channel['tag']
             elif cmd.startswith('MC'):
                 try:
                     idx = int(cmd[2:5])
@@ -160,52 +293,611 @@ class DummySerial:
                 except ValueError:
                     pass
             elif cmd == 'TX':
-                self.ptt = True
+                # Reine Abfrage wie beim echten Geraet, aendert die PTT nicht
+                self._reply(f'TX{int(self.ptt)};')
+            elif cmd in ('TX0', 'TX1'):
+                ptt = cmd == 'TX1'
+                if ptt != self.ptt:
+                    self._auto_info(f'TX{int(ptt)};')
+                self.ptt = ptt
             elif cmd == 'RX':
+                if self.ptt:
+                    self._auto_info('TX0;')
                 self.ptt = False
-            else:
-                # Fuer unbekannte Befehle eine generische OK-Antwort
-                self._responses.append(b'')
+            elif len(cmd) == 2:
+                # Unbekannte Abfragen beantwortet der TRX mit einem Fehler
+                self._reply('?;')
+
+    def _auto_info(self, frame):
+        """Bei aktivem AI-Modus eine unaufgeforderte Meldung einreihen."""
+        if self.auto_info:
+            self._reply(frame)
 
     def readline(self):
-        """Gebe vorbereitete Antwort zurueck."""
-        if self._responses:
-            return self._responses.pop(0)
-        return b''
+        """Naechsten Antwortrahmen zurueckgeben."""
+        end = self._rx.find(b';')
+        if end < 0:
+            return b''
+        frame = bytes(self._rx[:end + 1])
+        del self._rx[:end + 1]
+        return frame
+
+    @property
+    def in_waiting(self):
+        """Anzahl wartender Bytes wie bei ``serial.Serial``."""
+        return len(self._rx)
+
+    def read(self, size=1):
+        """Bis zu ``size`` Bytes lesen, bei leerem Puffer Timeout abwarten."""
+        if not self._rx:
+            time.sleep(self.timeout)
+            return b''
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
 
     def close(self):
         """Kein spezieller Aufraeumvorgang notwendig."""
         pass
 
 
-def open_serial_autodetect(port, start_baud=DEFAULT_BAUDRATE):
-    """Serielle Schnittstelle mit automatischer Baudratenerkennung oeffnen.
+def split_cat_frames(buffer):
+    """Vollstaendige ``;``-Rahmen aus ``buffer`` entnehmen.
+
+    Die Rahmen werden ohne Semikolon als Text zurueckgegeben, ein
+    unvollstaendiger Rest verbleibt im ``bytearray``.
+    """
+    frames = []
+    while True:
+        end = buffer.find(b';')
+        if end < 0:
+            break
+        frame = buffer[:end].decode('ascii', errors='ignore').strip()
+        del buffer[:end + 1]
+        if frame:
+            frames.append(frame)
+    return frames
+
+
+class CatLink:
+    """Semikolon-gerahmter Zugriff auf die CAT-Schnittstelle.
 
-    Es wird mit der angegebenen Baudrate begonnen und bei fehlender Antwort auf
-    das CAT-Kommando ``FA;`` schrittweise die naechsthoehere Baudrate getestet.
+    Antworten des FT-991A enden mit ``;`` statt mit einem Zeilenende. Die
+    empfangenen Bytes werden daher gepuffert, in Rahmen zerlegt und ueber
+    das zweistellige Praefix den offenen Abfragen zugeordnet. Mehrere
+    Abfragen koennen so in einem einzigen ``write()`` gesendet und ihre
+    Antworten verarbeitet werden, waehrend sie eintreffen. Rahmen, die zu
+    keiner Abfrage passen (Auto-Information), werden in ``unsolicited``
+    gesammelt, sobald sie jemand mit :meth:`read_unsolicited` abholt, und
+    auch dann nur bis ``UNSOLICITED_LIMIT``. Ohne Leser werden verspaetete
+    Antworten und Echos verworfen. Mehr als ``CAT_BUFFER_LIMIT`` Bytes ohne
+    ``;`` (falsche Baudrate, fremdes Geraet) werden verworfen.
     """
 
-    rates = [b for b in BAUDRATES if b >= start_baud]
-    if start_baud not in rates:
-        rates.insert(0, start_baud)
+    def __init__(self, ser_obj):
+        self.ser = ser_obj
+        self.buffer = bytearray()
+        self.unsolicited = deque(maxlen=UNSOLICITED_LIMIT)
+        self.keep_unsolicited = False
+        self.latencies = []
+
+    def _fill(self):
+        """Empfangene Bytes anhaengen, wartet hoechstens den Seriell-Timeout."""
+        waiting = self.ser.in_waiting
+        data = self.ser.read(waiting or 1)
+        if data:
+            self.buffer.extend(data)
+        return bool(data)
+
+    def _trim(self):
+        """Puffer ohne Rahmenende ab ``CAT_BUFFER_LIMIT`` leeren.
+
+        Nur nach :func:`split_cat_frames` aufrufen, dann enthaelt der Puffer
+        kein ``;`` mehr. Liefert ``True``, wenn Daten verworfen wurden.
+        """
+        if len(self.buffer) <= CAT_BUFFER_LIMIT:
+            return False
+        logger.debug('%d Bytes ohne Rahmenende verworfen', len(self.buffer))
+        self.buffer.clear()
+        return True
+
+    def write(self, data):
+        """Befehle ohne Antworterwartung senden."""
+        self.ser.write(data)
+
+    def query(self, commands, timeout=CAT_TIMEOUT, max_wait=CAT_MAX_WAIT):
+        """Abfragen gebuendelt senden und Antworten in Reihenfolge liefern.
+
+        Nicht beantwortete oder mit ``?;`` abgelehnte Abfragen ergeben einen
+        leeren String. Die Wartezeit ``timeout`` gilt ab dem letzten
+        empfangenen Byte, insgesamt wird aber hoechstens ``max_wait``
+        Sekunden gewartet, damit ein ununterbrochen sendendes Geraet die
+        Abfrage nicht endlos verlaengert. Empfaengt die Schnittstelle nur
+        Daten ohne Rahmenende, endet die Abfrage sofort. Die Laufzeit jeder
+        Antwort seit dem Senden steht anschliessend in ``latencies``.
+        """
+        replies = [''] * len(commands)
+        self.latencies = [None] * len(commands)
+        pending = [(i, cmd.decode('ascii')[:2]) for i, cmd in enumerate(commands)]
+        self._discard_stale({prefix for _, prefix in pending})
+        start = time.monotonic()
+        self.ser.write(b''.join(commands))
+        deadline = start + timeout
+        limit = start + max(max_wait, timeout)
+        while pending:
+            for frame in split_cat_frames(self.buffer):
+                self._match(frame, pending, replies, start)
+            if self._trim():
+                break
+            now = time.monotonic()
+            if not pending or now >= deadline or now >= limit:
+                break
+            if self._fill():
+                deadline = time.monotonic() + timeout
+        return replies
+
+    def query_timed(self, commands, timeout=CAT_TIMEOUT):
+        """Wie :meth:`query`, liefert zusaetzlich die Laufzeiten.
+
+        Im Seriell-Thread aufgerufen koennen ``latencies`` so nicht von
+        einer nachfolgenden Abfrage ueberschrieben werden.
+        """
+        replies = self.query(commands, timeout)
+        return replies, self.latencies
+
+    def _match(self, frame, pending, replies, start):
+        """Rahmen der aeltesten passenden Abfrage zuordnen."""
+        for pos, (idx, prefix) in enumerate(pending):
+            if frame == '?' or frame.startswith(prefix):
+                del pending[pos]
+                if frame != '?':
+                    replies[idx] = f'{frame};'
+                self.latencies[idx] = time.monotonic() - start
+                return
+        self._keep(frame)
+
+    def _keep(self, frame):
+        if self.keep_unsolicited:
+            self.unsolicited.append(f'{frame};')
+
+    def _discard_stale(self, prefixes):
+        """Vor einer Abfrage bereits Empfangenes einsortieren.
+
+        Rahmen mit dem Praefix einer der neuen Abfragen (oder ``?;``) stammen
+        von frueheren, abgelaufenen Abfragen und wuerden sonst faelschlich der
+        neuen zugeordnet; sie werden verworfen.
+        """
+        waiting = self.ser.in_waiting
+        if waiting:
+            self.buffer.extend(self.ser.read(waiting))
+        for frame in split_cat_frames(self.buffer):
+            if frame != '?' and frame[:2] not in prefixes:
+                self._keep(frame)
+        self._trim()
+
+    def read_unsolicited(self):
+        """Bereits empfangene unaufgeforderte Rahmen entnehmen (nicht blockierend)."""
+        self.keep_unsolicited = True
+        waiting = self.ser.in_waiting
+        if waiting:
+            self.buffer.extend(self.ser.read(waiting))
+        self.unsolicited.extend(f'{f};' for f in split_cat_frames(self.buffer))
+        self._trim()
+        frames = list(self.unsolicited)
+        self.unsolicited.clear()
+        return frames
+
+
+class LatencyStats:
+    """Einfache Laufzeitstatistik (Anzahl, letzter, mittlerer, maximaler Wert)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.maximum = 0.0
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def summary(self):
+        """Werte in Millisekunden."""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'last_ms': round(self.last * 1000, 1),
+            'avg_ms': round(self.total * 1000 / self.count, 1),
+            'max_ms': round(self.maximum * 1000, 1),
+        }
+
+
+class SerialWorker:
+    """Fuehrt alle Zugriffe auf die serielle Schnittstelle in einem Thread aus.
+
+    Blockierende PySerial-Aufrufe laufen so nie in der asyncio-Schleife.
+    Auftraege werden nach Prioritaet und innerhalb einer Prioritaet in
+    Eingangsreihenfolge abgearbeitet, was zugleich den exklusiven Zugriff
+    auf die Schnittstelle sicherstellt. Ein PTT-Befehl wartet so hoechstens
+    auf den gerade laufenden Auftrag.
+    """
+
+    def __init__(self, name='serial-io'):
+        self.name = name
+        self._jobs = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._thread = None
+        self.calls = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0
+        self.started = time.monotonic()
+
+    def start(self):
+        """Arbeitsthread bei Bedarf starten."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name,
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self, final=None, timeout=SERIAL_STOP_TIMEOUT):
+        """Arbeitsthread nach den bereits eingereihten Auftraegen beenden.
+
+        ``final`` laeuft als letzter Auftrag im Seriell-Thread. Wartet
+        hoechstens ``timeout`` Sekunden auf das Ende des Threads und liefert
+        ``False``, wenn er dann noch laeuft.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None or not thread.is_alive():
+            if final is not None:
+                final()
+            return True
+        self._jobs.put((PRIORITY_BACKGROUND + 1, next(self._seq), final))
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def _run(self):
+        while True:
+            _, _, job = self._jobs.get()
+            if not isinstance(job, tuple):
+                # Abschlussauftrag von stop()
+                if job is not None:
+                    try:
+                        job()
+                    except Exception:
+                        logger.exception('Abschluss des Seriell-Threads fehlgeschlagen')
+                break
+            loop, future, func, args, queued = job
+            begin = time.monotonic()
+            result = error = None
+            try:
+                result = func(*args)
+            except Exception as exc:
+                error = exc
+            elapsed = time.monotonic() - begin
+            self.calls += 1
+            self.busy_time += elapsed
+            self.wait_time += begin - queued
+            loop.call_soon_threadsafe(self._resolve, future, result, error)
+
+    @staticmethod
+    def _resolve(future, result, error):
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def call(self, func, *args, priority=PRIORITY_POLL):
+        """``func(*args)`` im Seriell-Thread ausfuehren und Ergebnis liefern."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job = (loop, future, func, args, time.monotonic())
+        self._jobs.put((priority, next(self._seq), job))
+        return await future
+
+    def stats(self):
+        """Zeitanteile des Seriell-Threads seit dem Start."""
+        uptime = max(time.monotonic() - self.started, 1e-9)
+        return {
+            'calls': self.calls,
+            'busy_ms': round(self.busy_time * 1000),
+            'busy_share': round(self.busy_time / uptime, 3),
+            'avg_queue_wait_ms': round(
+                self.wait_time * 1000 / self.calls, 1) if self.calls else 0.0,
+        }
+
+
+def parse_frequency(value):
+    """Frequenz in Hz aus einer FA-Antwort wie ``FA014074000;`` lesen."""
+    if not value:
+        return None
+    digits = ''.join(ch for ch in str(value) if ch.isdigit())
+    return int(digits) if digits else None
+
+
+class CommandCoalescer:
+    """Fasst schnell aufeinanderfolgende Abstimmbefehle zusammen.
+
+    Waehrend ein Schreibauftrag auf der Leitung ist, wird von mehreren
+    Frequenzwuenschen nur der neueste behalten und Encoder-Schritte werden
+    aufsummiert. Ein einzelner Encoder-Schritt geht unveraendert als
+    ``EU;``/``ED;`` an den TRX, der ihn mit seiner eingestellten
+    Schrittweite ausfuehrt. Die dabei beobachtete Frequenzaenderung ist die
+    Schrittweite der aktuellen Betriebsart; erst wenn sie bekannt ist,
+    werden mehrere Schritte zu einem absoluten ``FA``-Befehl zusammengefasst,
+    sonst als Folge von ``EU;``/``ED;`` in einem Schreibvorgang gesendet.
+    ``step_hz`` gibt die Schrittweite stattdessen fest vor.
+    """
+
+    def __init__(self, rig, step_hz=ENCODER_STEP_HZ):
+        self.rig = rig
+        self.step_hz = step_hz
+        # Betriebsart (MD-Antwort) -> beobachtete Schrittweite in Hz
+        self.dial_steps = {}
+        # (Ausgangsfrequenz, Richtung, Betriebsart, Zeitpunkt) eines Einzelschritts
+        self.observing = None
+        self.frequency = None
+        self.steps = 0
+        self.target = None
+        self.target_time = 0.0
+        self.received = 0
+        self.written = 0
+        self._task = None
+
+    def set_frequency(self, freq):
+        """Neue Zielfrequenz vormerken, vorherige Wuensche verwerfen."""
+        self.frequency = freq
+        self.steps = 0
+        self.received += 1
+        self._kick()
+
+    def encoder(self, steps):
+        """Encoder-Schritte (positiv = hoch) vormerken."""
+        self.steps += steps
+        self.received += 1
+        self._kick()
+
+    def _kick(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush())
+
+    def _base_frequency(self):
+        if self.target is not None and \
+                time.monotonic() - self.target_time < TUNING_HOLD:
+            return self.target
+        return parse_frequency(
+            self.rig.last_values.get('FA', self.rig.last_frequency))
+
+    def dial_step(self):
+        """Schrittweite eines Encoder-Befehls in Hz, ``None`` wenn unbekannt."""
+        if self.step_hz:
+            return self.step_hz
+        return self.dial_steps.get(self.rig.last_values.get('MD'))
+
+    def observe_frequency(self, freq):
+        """Neue FA-Frequenz pruefen, ob sie die Folge eines Einzelschritts ist."""
+        if self.observing is None or freq is None:
+            return
+        base, direction, mode, since = self.observing
+        if time.monotonic() - since > ENCODER_OBSERVE_TIME:
+            self.observing = None
+            return
+        diff = (freq - base) * direction
+        if diff <= 0:
+            return
+        self.observing = None
+        # Lag die Ausgangsfrequenz neben dem Raster, rastet der TRX nur ein
+        if base % diff == 0 and mode is not None:
+            self.dial_steps[mode] = diff
+
+    def _take(self):
+        """Ausstehende Befehle zu einem Schreibauftrag zusammenfassen."""
+        freq = self.frequency
+        steps = self.steps
+        base = freq if freq is not None else self._base_frequency()
+        step = self.dial_step()
+        self.frequency = None
+        self.steps = 0
+        if steps and (base is None or step is None or
+                      (freq is None and abs(steps) == 1)):
+            # Relativ abstimmen: der TRX wendet seine eigene Schrittweite an
+            code = b'EU;' if steps > 0 else b'ED;'
+            payload = code * abs(steps)
+            if freq is not None:
+                payload = f'FA{freq:011d};'.encode('ascii') + payload
+            self.target = None
+            now = time.monotonic()
+            if self.observing is not None and \
+                    now - self.observing[3] <= ENCODER_OBSERVE_TIME:
+                # Vorheriger Schritt noch ohne Rueckmeldung: Zuordnung unsicher
+                self.observing = None
+            elif abs(steps) == 1 and base is not None and not self.step_hz:
+                self.observing = (base, steps, self.rig.last_values.get('MD'), now)
+            return payload
+        freq = base + steps * step if steps else base
+        self.target = freq
+        self.target_time = time.monotonic()
+        return f'FA{freq:011d};'.encode('ascii')
+
+    async def _flush(self):
+        while self.frequency is not None or self.steps:
+            payload = self._take()
+            link = self.rig.get_link()
+            if link is None:
+                continue
+            try:
+                await self.rig.worker.call(link.write, payload,
+                                           priority=PRIORITY_OPERATOR)
+            except (OSError, SerialException):
+                logger.warning('Serial write failed while tuning')
+            self.written += 1
+
+    def stats(self):
+        return {'received': self.received, 'written': self.written,
+                'merged': self.received - self.written}
+
+
+async def query_chunked(worker, link, commands, chunk,
+                        priority=PRIORITY_BACKGROUND):
+    """Abfragen in kleinen Bloecken senden, damit Vorrangbefehle dazwischen passen."""
+    replies = []
+    latencies = []
+    for first in range(0, len(commands), chunk):
+        part = commands[first:first + chunk]
+        part_replies, part_latencies = await worker.call(
+            link.query_timed, part, priority=priority)
+        replies.extend(part_replies)
+        latencies.extend(part_latencies)
+    return replies, latencies
+
+
+def load_serial_config():
+    """Zuletzt erfolgreichen Port und Baudrate aus ``config.json`` lesen."""
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            cfg = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    return cfg.get('serial_port'), cfg.get('baudrate')
+
+
+def save_serial_config(port, baudrate):
+    """Gefundenen Port und Baudrate in ``config.json`` uebernehmen.
+
+    Die uebrigen Einstellungen der GUI bleiben erhalten.
+    """
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            cfg = json.load(f)
+    except (OSError, ValueError):
+        cfg = {}
+    if cfg.get('serial_port') == port and cfg.get('baudrate') == baudrate:
+        return
+    cfg['serial_port'] = port
+    cfg['baudrate'] = baudrate
+    try:
+        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cfg, f, ensure_ascii=False, indent=2)
+    except OSError:
+        logger.warning('Konfiguration konnte nicht gespeichert werden')
+
+
+def candidate_ports(preferred=None):
+    """Serielle Ports in Suchreihenfolge, der bevorzugte zuerst."""
+    ports = []
+    if list_ports is not None:
+        try:
+            ports = [p.device for p in list_ports.comports()]
+        except Exception:
+            logger.exception('Serielle Ports konnten nicht ermittelt werden')
+    if preferred:
+        ports = [preferred] + [p for p in ports if p != preferred]
+    return ports
+
+
+def probe_port(port, rates, timeout=PROBE_TIMEOUT, found=None):
+    """Port mit den angegebenen Baudraten nach einem FT-991A absuchen.
+
+    Liefert die geoeffnete Schnittstelle oder ``None``. Ist ``found`` gesetzt,
+    wurde der TRX bereits an einem anderen Port gefunden und die Suche endet.
+    Jede Baudrate wird hoechstens ``PROBE_MAX_WAIT`` Sekunden getestet, auch
+    wenn am Port ein anderes Geraet ununterbrochen sendet.
+    """
     for rate in rates:
+        if found is not None and found.is_set():
+            return None
         try:
-            ser_obj = serial.Serial(port, rate, timeout=1)
-        except SerialException:
-            continue
+            ser_obj = serial.Serial(port, rate, timeout=SERIAL_READ_TIMEOUT)
+        except (OSError, SerialException):
+            return None
         try:
-            ser_obj.write(b'FA;')
-            if ser_obj.readline().strip():
-                logger.info('Baudrate %d erkannt', rate)
-                return ser_obj
-        except SerialException:
-            pass
+            reply = CatLink(ser_obj).query([b'ID;'], timeout=timeout,
+                                           max_wait=PROBE_MAX_WAIT)[0]
+        except (OSError, SerialException):
+            reply = ''
+        if reply.startswith('ID' + RIG_ID):
+            return ser_obj
+        if reply:
+            logger.info('Port %s: unbekannte Kennung %s', port, reply)
+        ser_obj.close()
+    return None
+
+
+def _close_probe(future, keep):
+    """Von einer nicht mehr benoetigten Portsuche geoeffnete Schnittstelle schliessen."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    ser_obj = future.result()
+    if ser_obj is not None and ser_obj is not keep:
         ser_obj.close()
-    raise SerialException('Baudrate konnte nicht ermittelt werden')
 
 
-def load_poll_commands():
-    """Load CAT commands that allow reading or answering."""
+def discover_rig(port=None, baudrate=None, timeout=PROBE_TIMEOUT, scan=True):
+    """FT-991A an allen seriellen Ports parallel suchen.
+
+    Zuerst wird der angegebene bzw. zuletzt erfolgreiche Port mit der
+    bekannten Baudrate getestet. Antwortet er nicht, werden alle Ports
+    gleichzeitig mit allen Baudraten abgefragt. Der Treffer wird in
+    ``config.json`` gespeichert.
+
+    Mit ``scan=False`` wird nur ``port`` mit allen Baudraten getestet und
+    nichts gespeichert. Das ist fuer den Betrieb mehrerer TRX gedacht, bei
+    dem die Suche keine Ports anderer Geraete belegen darf.
+    """
+    if not scan:
+        rates = [b for b in [baudrate] + BAUDRATES if b]
+        ser_obj = probe_port(port, list(dict.fromkeys(rates)), timeout)
+        if ser_obj is None:
+            raise SerialException(f'Kein FT-991A an {port}')
+        logger.info('FT-991A an %s mit %d Baud gefunden', port, ser_obj.baudrate)
+        return ser_obj
+    saved_port, saved_baud = load_serial_config()
+    port = port or saved_port
+    baudrate = baudrate or saved_baud or DEFAULT_BAUDRATE
+    rates = [baudrate] + [b for b in BAUDRATES if b != baudrate]
+    start = time.monotonic()
+    ser_obj = None
+    if port:
+        ser_obj = probe_port(port, [baudrate], timeout)
+    if ser_obj is None:
+        ports = candidate_ports(port)
+        found = threading.Event()
+        if ports:
+            pool = ThreadPoolExecutor(max_workers=len(ports))
+            futures = [pool.submit(probe_port, p, rates, timeout, found)
+                       for p in ports]
+            try:
+                for future in as_completed(futures):
+                    ser_obj = future.result()
+                    if ser_obj is not None:
+                        break
+            finally:
+                # Nicht auf die uebrigen Ports warten; was sie danach noch
+                # oeffnen, wird sofort wieder geschlossen
+                found.set()
+                for future in futures:
+                    future.add_done_callback(
+                        lambda f, hit=ser_obj: _close_probe(f, hit))
+                pool.shutdown(wait=False, cancel_futures=True)
+    if ser_obj is None:
+        raise SerialException('FT-991A an keinem seriellen Port gefunden')
+    logger.info('FT-991A an %s mit %d Baud gefunden (%.0f ms)', ser_obj.port,
+                ser_obj.baudrate, (time.monotonic() - start) * 1000)
+    save_serial_config(ser_obj.port, ser_obj.baudrate)
+    return ser_obj
+
+
+def load_poll_commands(auto_info=False):
+    """Load CAT commands that allow reading or answering.
+
+    With ``auto_info`` only commands are returned whose changes are not
+    reported by the transceiver in Auto-Information mode.
+    """
     commands = []
     summary = os.path.join(BASE_DIR, '..', 'docs', 'cat_commands_summary.md')
     try:
@@ -217,154 +909,848 @@ def load_poll_commands():
                 if len(parts) < 6 or parts[1] == 'Command':
                     continue
                 cmd, read, ans = parts[1], parts[4], parts[5]
+                if auto_info and (len(parts) < 7 or parts[6] == 'O'):
+                    continue
                 if (read == 'O' or ans == 'O') and len(cmd) == 2:
                     commands.append(f'{cmd};'.encode('ascii'))
     except FileNotFoundError:
         logger.warning('CAT command summary not found, using minimal set')
-        commands = [b'FA;', b'MD;', b'SM;']
+        commands = [b'SM;'] if auto_info else [b'FA;', b'MD;', b'SM;']
     return commands
 
 
-async def read_memory_channels():
-    """Read all memory channels once and return list of indices that are used."""
-    memories = []
-    if ser is None:
-        return memories
+def parse_memory_reply(reply):
+    """MT-Antwort in ein Dictionary mit dem Kanalinhalt zerlegen.
+
+    Aufbau: ``MT`` Kanal(3) Frequenz(9) Clarifier(5) RX-Clar(1) TX-Clar(1)
+    Modus(1) Speicher(1) Tonmodus(1) 00 Ablage(1) Name(12).
+    """
+    frame = (reply or '').rstrip(';')
+    if len(frame) < 27 or frame[:2] not in ('MT', 'MR'):
+        return None
     try:
-        async with ser_lock:
-            for i in range(125):
-                try:
-                    ser.write(f'MR{i:03d};'.encode('ascii'))
-                except OSError:
-                    # Unter Windows kann PySerial einen OSError liefern, wenn
-                    # der Handle ungueltig wurde.
-                    logger.warning('Serial write failed during memory scan')
-                    break
-                try:
-                    raw = ser.readline()
-                except (AttributeError, TypeError, SerialException):
-                    # PySerial wirft mitunter AttributeError, wenn die
-                    # Schnittstelle unerwartet geschlossen wurde.
-                    logger.warning('Serial read failed during memory scan')
-                    break
-                reply = raw.decode('ascii', errors='ignore').strip()
-                if reply and any(ch != '0' for ch in reply):
-                    memories.append(i)
-    except Exception:
-        logger.exception('Failed to read memories')
-    return memories
+        channel = int(frame[2:5])
+        frequency = int(frame[5:14])
+    except ValueError:
+        return None
+    return {
+        'channel': channel,
+        'frequency': frequency,
+        'clarifier': frame[14:19],
+        'mode': f'0{frame[21]}',
+        'tone_mode': frame[23],
+        'shift': frame[26],
+        'tag': frame[27:27 + MEMORY_TAG_LENGTH].rstrip(),
+    }
+
+
+def format_memory_command(channel):
+    """Speicherkanal als MT-Setzbefehl formatieren, ``None`` bei Fehlern."""
+    try:
+        idx = int(channel['channel'])
+        frequency = int(channel['frequency'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    mode_code = normalize_mode_code(channel.get('mode', '01'))
+    tone_mode = str(channel.get('tone_mode', '0'))
+    shift = str(channel.get('shift', '0'))
+    tag = str(channel.get('tag', ''))[:MEMORY_TAG_LENGTH]
+    if (mode_code is None or not 0 <= idx < MEMORY_COUNT
+            or not 0 < frequency < 10 ** 9 or tone_mode not in '01234'
+            or shift not in '012' or not tag.isascii()):
+        return None
+    return (f'MT{idx:03d}{frequency:09d}+000000{mode_code[1]}1{tone_mode}00'
+            f'{shift}{tag:<{MEMORY_TAG_LENGTH}};').encode('ascii')
 
 
-async def run_startup_tests(send_func=None):
-    """Einige einfache CAT-Befehle pruefen und zusaetzlich Speicher testen."""
-    if ser is None:
+def load_memory_cache(callsign):
+    """Zwischengespeicherte Speicherkanaele eines TRX laden."""
+    try:
+        with open(MEMORY_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get(callsign, {})
+    except (OSError, ValueError):
         return {}
-    commands = [
-        b'FA;',  # Frequenz VFO-A
-        b'FB;',  # Frequenz VFO-B
-        b'MD;',  # Betriebsart
-        b'IF;',  # Statusinformationen
-        b'PC;',  # Ausgangsleistung
-        b'SM;',  # S-Meter
-        b'RG;',  # RF-Gain
-        b'GT;',  # AGC-Funktion
-        b'NR;',  # Noise Reduction
-        b'NB;'   # Noise Blanker
-    ]
-    results = {}
-    memories = []
+
+
+def save_memory_cache(callsign, details):
+    """Speicherkanaele eines TRX im Cache ablegen."""
     try:
-        async with ser_lock:
-            for cmd in commands:
-                try:
-                    ser.write(cmd)
-                except (OSError, SerialException):
-                    logger.warning('Serial write failed during startup tests')
-                    break
-                try:
-                    reply = ser.readline().decode('ascii', errors='ignore').strip()
-                except (AttributeError, TypeError, SerialException):
-                    logger.warning('Serial read failed during startup tests')
+        with open(MEMORY_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache[callsign] = details
+    try:
+        with open(MEMORY_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+    except OSError:
+        logger.exception('Speicher-Cache konnte nicht geschrieben werden')
+
+
+class PollScheduler:
+    """Verteilt CAT-Abfragen nach Prioritaet auf ein serielles Zeitbudget.
+
+    Schnelle Werte (Frequenz, S-Meter, PTT, Modus) werden in jedem Zyklus
+    abgefragt. Die uebrigen Befehle fuellen das restliche Budget, wobei
+    der am laengsten ueberfaellige Befehl zuerst an die Reihe kommt. Die
+    Kosten pro Befehl werden aus der Baudrate geschaetzt und anschliessend
+    aus den gemessenen Laufzeiten nachgefuehrt.
+    """
+
+    def __init__(self, commands, baudrate=DEFAULT_BAUDRATE,
+                 cycle=SERIAL_POLLING):
+        self.cycle = cycle
+        self.baudrate = baudrate or DEFAULT_BAUDRATE
+        self.budget = cycle * POLL_BUDGET_SHARE
+        self.interval = {}
+        self.tier = {}
+        self.rank = {}
+        self.cost = {}
+        self.last_poll = {}
+        self.period = {}
+        self.misses = {}
+        for cmd in commands:
+            key = cmd.decode('ascii').strip(';')
+            for rank, (name, keys, interval) in enumerate(POLL_TIERS):
+                if keys is None or key in keys:
+                    self.tier[cmd] = name
+                    self.rank[cmd] = rank
+                    self.interval[cmd] = interval
                     break
-                key = cmd.decode('ascii').strip(';')
-                logger.info('Starttest %s -> %s', key, reply)
-                if reply:
-                    results[key] = reply
-            # Erste zehn Speicherkanaele pruefen
-            for i in range(10):
+            self.cost[cmd] = self.estimate_cost(cmd)
+            self.misses[cmd] = 0
+
+    def estimate_cost(self, cmd):
+        """Geschaetzte Sekunden auf der Leitung fuer Abfrage und Antwort."""
+        size = len(cmd) + CAT_REPLY_BYTES
+        return size * CAT_BITS_PER_BYTE / self.baudrate + CAT_TURNAROUND
+
+    def next_cycle(self, now=None):
+        """Befehle fuer den naechsten Zyklus innerhalb des Budgets waehlen."""
+        if now is None:
+            now = time.monotonic()
+        selected = [c for c in self.tier if self.tier[c] == 'fast']
+        fast_count = len(selected)
+        used = sum(self.cost[c] for c in selected)
+        due = []
+        for cmd, tier in self.tier.items():
+            if tier == 'fast':
+                continue
+            interval = self.interval[cmd]
+            if self.misses[cmd] >= POLL_SILENT_AFTER:
+                interval = POLL_SILENT_INTERVAL
+            last = self.last_poll.get(cmd)
+            if last is None:
+                due.append((float('inf'), cmd))
+            elif now - last >= interval:
+                due.append(((now - last) / interval, cmd))
+        due.sort(key=lambda item: (item[0], -self.rank[item[1]]), reverse=True)
+        for _, cmd in due:
+            # Mindestens einen ueberfaelligen Befehl pro Zyklus zulassen,
+            # damit langsame Werte nie vollstaendig verhungern.
+            if used + self.cost[cmd] > self.budget and len(selected) > fast_count:
+                break
+            selected.append(cmd)
+            used += self.cost[cmd]
+        return selected
+
+    def record(self, cmd, duration, answered, now=None):
+        """Gemessene Laufzeit und Ergebnis einer Abfrage verbuchen."""
+        if now is None:
+            now = time.monotonic()
+        self.cost[cmd] = 0.8 * self.cost[cmd] + 0.2 * duration
+        self.misses[cmd] = 0 if answered else self.misses[cmd] + 1
+        last = self.last_poll.get(cmd)
+        if last is not None:
+            period = self.period.get(cmd)
+            delta = now - last
+            self.period[cmd] = delta if period is None else 0.8 * period + 0.2 * delta
+        self.last_poll[cmd] = now
+
+    def refresh_rates(self):
+        """Tatsaechlich erreichte Abfragerate je Befehl in Hz."""
+        return {
+            cmd.decode('ascii').strip(';'): round(1.0 / period, 3)
+            for cmd, period in self.period.items() if period > 0
+        }
+
+
+POLL_COMMANDS = load_poll_commands()
+AUTO_INFO_POLL_COMMANDS = load_poll_commands(auto_info=True)
+
+
+class Rig:
+    """Ein angeschlossener FT-991A mit eigenem Zustand.
+
+    Jede Instanz besitzt ihre serielle Schnittstelle, einen eigenen
+    Seriell-Thread, Pollplan und die zuletzt gelesenen Werte. So kann ein
+    Prozess mit einer Event-Schleife mehrere Funkgeraete bedienen. Wert-
+    und Speicherstand bleiben ueber Websocket-Neuverbindungen erhalten,
+    nur beim ersten Verbinden wird alles gelesen.
+    """
+
+    def __init__(self, callsign=DEFAULT_CALLSIGN, ser_obj=None, scan=True,
+                 step_hz=ENCODER_STEP_HZ):
+        self.callsign = callsign
+        self.ser = ser_obj
+        self.port = getattr(ser_obj, 'port', None)
+        # Bei mehreren TRX nur den eigenen Port erneut oeffnen
+        self.scan = scan
+        self.link = None
+        self.worker = SerialWorker(f'serial-{callsign}')
+        self.coalescer = CommandCoalescer(self, step_hz)
+        self.key_down_latency = LatencyStats()
+        self.reconnect_lock = asyncio.Lock()
+        self.last_frequency = None
+        self.last_values = {}
+        # Schluessel -> Zeitpunkt (monotonic) der letzten Antwort des TRX dazu,
+        # auch wenn sich der Wert nicht geaendert hat
+        self.confirmed = {}
+        # Letzter erfolgreicher Lesevorgang des AI-Lesers
+        self.auto_info_seen = None
+        self.memory_channels = []
+        # Inhalt der belegten Speicherkanaele, Schluessel ist die Kanalnummer als Text
+        self.memory_details = {}
+        self.startup_results = {}
+        self.startup_done = False
+
+    def get_link(self):
+        """CatLink fuer die aktuelle serielle Schnittstelle liefern."""
+        if self.ser is None:
+            return None
+        if self.link is None or self.link.ser is not self.ser:
+            self.link = CatLink(self.ser)
+        return self.link
+
+    def close(self):
+        """Seriellen Thread beenden und Schnittstelle schliessen.
+
+        ``AI0;`` geht als letzter Auftrag durch den Seriell-Thread, die
+        Schnittstelle wird erst nach dessen Ende geschlossen.
+        """
+        ser = self.ser
+
+        def finish():
+            if AUTO_INFO and ser is not None:
                 try:
-                    ser.write(f'MR{i:03d};'.encode('ascii'))
+                    ser.write(b'AI0;')
                 except (OSError, SerialException):
-                    logger.warning('Serial write failed during memory scan')
-                    break
-                try:
-                    reply = ser.readline().decode('ascii', errors='ignore').strip()
-                except (AttributeError, TypeError, SerialException):
-                    logger.warning('Serial read failed during memory scan')
-                    break
-                logger.info('Starttest MR%03d -> %s', i, reply)
-                if reply and any(ch != '0' for ch in reply):
-                    memories.append(i)
-    except Exception:
-        logger.exception('Starttests fehlgeschlagen')
-    if send_func is not None:
-        if results:
-            try:
-                await send_func({'values': results})
-            except Exception:
-                logger.exception('Senden der Starttests fehlgeschlagen')
-        if memories:
+                    pass
+
+        if not self.worker.stop(finish):
+            logger.warning('%s: Seriell-Thread reagiert nicht, Schnittstelle '
+                           'wird trotzdem geschlossen', self.callsign)
+        if ser is not None:
+            ser.close()
+            self.ser = None
+
+    async def reconnect(self):
+        """Nach Verlust der seriellen Verbindung erneut nach dem TRX suchen."""
+        if self.ser is None or isinstance(self.ser, DummySerial):
+            return
+        if self.reconnect_lock.locked():
+            async with self.reconnect_lock:
+                return
+        async with self.reconnect_lock:
+            old, self.ser = self.ser, None
             try:
-                await send_func({'memory_channels': memories})
-            except Exception:
-                logger.exception('Senden der Speicherliste fehlgeschlagen')
-    return results
+                old.close()
+            except (OSError, SerialException):
+                pass
+            logger.warning('%s: Serielle Verbindung verloren, suche TRX erneut',
+                           self.callsign)
+            loop = asyncio.get_running_loop()
+            while self.ser is None:
+                try:
+                    self.ser = await loop.run_in_executor(
+                        None, discover_rig, self.port, old.baudrate,
+                        PROBE_TIMEOUT, self.scan)
+                except SerialException:
+                    await asyncio.sleep(RECONNECT_INTERVAL)
+            self.port = self.ser.port
 
+    def update_value(self, key, value, changed):
+        """Neuen CAT-Wert in ``last_values`` uebernehmen und Aenderung merken."""
+        self.confirmed[key] = time.monotonic()
+        if self.last_values.get(key) != value:
+            self.last_values[key] = value
+            changed[key] = value
+        if key == 'FA':
+            self.last_frequency = value
+            self.coalescer.observe_frequency(parse_frequency(value))
 
-POLL_COMMANDS = load_poll_commands()
+    def confirmations(self, since):
+        """Bestaetigungszeitpunkte (monotonic) aller Werte seit ``since``.
 
-async def poll_trx(send_func=None):
-    """Poll the transceiver for various CAT values and optionally send updates."""
-    global LAST_FREQUENCY, LAST_VALUES
-    while True:
-        await asyncio.sleep(SERIAL_POLLING)
-        if ser is None:
-            continue
-        changed = {}
+        Im AI-Modus meldet der TRX Aenderungen selbst; solange der Leser die
+        Schnittstelle fehlerfrei liest, gelten diese Werte als bestaetigt.
+        """
+        confirmed = {key: stamp for key, stamp in self.confirmed.items()
+                     if stamp > since}
+        seen = self.auto_info_seen
+        if seen is not None and seen > since:
+            for key in self.last_values:
+                if f'{key};'.encode('ascii') not in AUTO_INFO_POLL_COMMANDS:
+                    confirmed[key] = max(confirmed.get(key, seen), seen)
+        return confirmed
+
+    def is_busy(self):
+        """Squelch-Status aus ``BY`` (True = Signal), ``None`` wenn unbekannt."""
+        value = self.last_values.get('BY')
+        if not value or len(value) < 3 or value[2] not in '01':
+            return None
+        return value[2] == '1'
+
+    def memory_channel_list(self):
+        """Nummern der belegten Kanaele in aufsteigender Reihenfolge."""
+        return sorted(int(idx) for idx in self.memory_details)
+
+    async def read_memory_channels(self, progress=None, channels=None):
+        """Read memory channels and return their contents keyed by channel.
+
+        ``progress`` is awaited with the contents of every chunk (``None`` for
+        empty channels) as soon as the chunk has been read. ``channels``
+        restricts the scan to the given channel numbers.
+        """
+        memories = {}
+        link = self.get_link()
+        if link is None:
+            return memories
+        if channels is None:
+            channels = range(MEMORY_COUNT)
+        channels = list(channels)
         try:
-            async with ser_lock:
-                for cmd in POLL_COMMANDS:
-                    ser.write(cmd)
-                    reply = ser.readline().decode('ascii', errors='ignore').strip()
-                    if not reply:
-                        continue
+            for first in range(0, len(channels), MEMORY_SCAN_CHUNK):
+                indices = channels[first:first + MEMORY_SCAN_CHUNK]
+                queries = [f'MT{i:03d};'.encode('ascii') for i in indices]
+                replies, _ = await query_chunked(self.worker, link, queries,
+                                                 MEMORY_SCAN_CHUNK)
+                chunk = {str(i): parse_memory_reply(reply)
+                         for i, reply in zip(indices, replies)}
+                memories.update((k, v) for k, v in chunk.items() if v is not None)
+                if progress is not None:
+                    await progress(chunk)
+        except (OSError, SerialException):
+            # Unter Windows kann PySerial einen OSError liefern, wenn
+            # der Handle ungueltig wurde.
+            logger.warning('Serial access failed during memory scan')
+        except Exception:
+            logger.exception('Failed to read memories')
+        return memories
+
+    async def run_startup_tests(self, send_func=None):
+        """Einige einfache CAT-Befehle pruefen.
+
+        Die Befehle laufen in kleinen Bloecken mit niedriger Prioritaet, jede
+        beantwortete Abfrage wird sofort ueber ``send_func`` gemeldet.
+        """
+        link = self.get_link()
+        if link is None:
+            return {}
+        commands = [
+            b'FA;',  # Frequenz VFO-A
+            b'FB;',  # Frequenz VFO-B
+            b'MD;',  # Betriebsart
+            b'IF;',  # Statusinformationen
+            b'PC;',  # Ausgangsleistung
+            b'SM;',  # S-Meter
+            b'RG;',  # RF-Gain
+            b'GT;',  # AGC-Funktion
+            b'NR;',  # Noise Reduction
+            b'NB;'   # Noise Blanker
+        ]
+        results = {}
+        try:
+            for first in range(0, len(commands), STARTUP_CHUNK):
+                part = commands[first:first + STARTUP_CHUNK]
+                replies, _ = await query_chunked(self.worker, link, part,
+                                                 STARTUP_CHUNK)
+                answered = {}
+                for cmd, reply in zip(part, replies):
                     key = cmd.decode('ascii').strip(';')
-                    if LAST_VALUES.get(key) != reply:
-                        LAST_VALUES[key] = reply
-                        changed[key] = reply
-                    if cmd == b'FA;':
-                        LAST_FREQUENCY = reply
+                    logger.info('%s: Starttest %s -> %s', self.callsign, key, reply)
+                    if reply:
+                        answered[key] = reply
+                        self.update_value(key, reply, {})
+                results.update(answered)
+                if answered and send_func is not None:
+                    try:
+                        await send_func({'values': answered})
+                    except Exception:
+                        logger.exception('Senden der Starttests fehlgeschlagen')
+        except (OSError, SerialException):
+            logger.warning('Serial access failed during startup tests')
         except Exception:
-            logger.exception('Polling error')
-        if changed and send_func is not None:
+            logger.exception('Starttests fehlgeschlagen')
+        return results
+
+    async def snapshot_answers(self, commands=None, timeout=SNAPSHOT_TIMEOUT,
+                               progress=None):
+        """Antworten vieler CAT-Befehle in einem Durchlauf einsammeln.
+
+        Die Befehle werden blockweise ohne Pause hintereinander gesendet,
+        ``timeout`` begrenzt die Wartezeit auf jede weitere Antwort. Nach
+        jedem Block wird ``progress`` mit dessen Ergebnissen aufgerufen.
+        Liefert ``{Befehl: {'answer': ..., 'latency_ms': ...}}``.
+        """
+        link = self.get_link()
+        if link is None:
+            return {}
+        if commands is None:
+            commands = POLL_COMMANDS
+        commands = [c if isinstance(c, bytes) else
+                    f"{c.strip().rstrip(';')};".encode('ascii') for c in commands]
+        results = {}
+        for first in range(0, len(commands), SNAPSHOT_CHUNK):
+            part = commands[first:first + SNAPSHOT_CHUNK]
+            replies, latencies = await self.worker.call(
+                link.query_timed, part, timeout, priority=PRIORITY_BACKGROUND)
+            chunk = {}
+            previous = 0.0
+            for cmd, reply, latency in zip(part, replies, latencies):
+                entry = {'answer': reply, 'latency_ms': None}
+                if latency is not None:
+                    # Zeit seit der vorherigen Antwort im selben Block
+                    entry['latency_ms'] = round((latency - previous) * 1000, 1)
+                    previous = latency
+                chunk[cmd.decode('ascii').strip(';')] = entry
+            results.update(chunk)
+            if progress is not None:
+                await progress(chunk, len(results), len(commands))
+        return results
+
+    async def enable_auto_info(self):
+        """AI-Modus einschalten und einmalig den kompletten Zustand anfordern.
+
+        Die Antworten werden vom :meth:`auto_info_reader` verarbeitet.
+        """
+        link = self.get_link()
+        if link is None:
+            return
+        try:
+            await self.worker.call(link.write, b'AI1;' + b''.join(POLL_COMMANDS),
+                                   priority=PRIORITY_BACKGROUND)
+            logger.info('%s: Auto-Information aktiviert', self.callsign)
+        except (OSError, SerialException):
+            logger.warning('Auto-Information konnte nicht aktiviert werden')
+
+    async def auto_info_reader(self, send_func=None):
+        """Unaufgeforderte CAT-Meldungen fortlaufend lesen und weiterleiten."""
+        while True:
+            link = self.get_link()
+            if link is None:
+                await asyncio.sleep(1)
+                continue
             try:
-                await send_func(changed)
+                frames = await self.worker.call(link.read_unsolicited)
+                self.auto_info_seen = time.monotonic()
+            except (OSError, SerialException):
+                logger.warning('Serial read failed in auto information mode')
+                await self.reconnect()
+                await asyncio.sleep(1)
+                continue
+            if not frames:
+                await asyncio.sleep(AUTO_INFO_IDLE)
+                continue
+            changed = {}
+            for frame in frames:
+                key = frame[:2]
+                if key.isalpha() and key.isupper():
+                    self.update_value(key, frame, changed)
+            if changed and send_func is not None:
+                try:
+                    await send_func(changed)
+                except Exception:
+                    logger.exception('Failed to send update')
+
+    async def query_value(self, key):
+        """Aktuellen Wert liefern und bei Bedarf beim TRX abfragen."""
+        reply = self.last_values.get(key)
+        if key == 'FA' and reply is None:
+            reply = self.last_frequency
+        link = self.get_link()
+        if reply is not None or link is None:
+            return reply
+        replies = await self.worker.call(link.query, [f'{key};'.encode('ascii')],
+                                         priority=PRIORITY_OPERATOR)
+        return replies[0]
+
+    async def poll(self, send_func=None, auto_info=False, offset=0.0):
+        """Poll the transceiver for various CAT values and optionally send updates.
+
+        The commands of one cycle are sent as separate serial jobs of
+        ``POLL_CHUNK`` queries each (one by default), so operator writes and
+        PTT can get in between; the pipelining of :meth:`CatLink.query` only
+        applies to polling if ``POLL_CHUNK`` is raised. In Auto-Information
+        mode only the values the transceiver does not report on its own are
+        requested.
+        ``offset`` delays the first cycle so that several rigs do not wake
+        up at the same moment.
+        """
+        scheduler = None
+        last_stats = time.monotonic()
+        max_lag = 0.0
+        delay = offset
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(delay)
+            # Verspaetung des Weckens zeigt, wie lange die Schleife blockiert war
+            max_lag = max(max_lag, time.monotonic() - before - delay)
+            delay = SERIAL_POLLING
+            link = self.get_link()
+            if link is None:
+                continue
+            if scheduler is None:
+                commands = AUTO_INFO_POLL_COMMANDS if auto_info else POLL_COMMANDS
+                scheduler = PollScheduler(
+                    commands, getattr(self.ser, 'baudrate', DEFAULT_BAUDRATE))
+                logger.info('%s: Pollbudget %.0f ms pro Zyklus bei %d Baud',
+                            self.callsign, scheduler.budget * 1000,
+                            scheduler.baudrate)
+            changed = {}
+            try:
+                cycle = scheduler.next_cycle()
+                replies, latencies = await query_chunked(
+                    self.worker, link, cycle, POLL_CHUNK, priority=PRIORITY_POLL)
+                for pos, (cmd, reply, latency) in enumerate(
+                        zip(cycle, replies, latencies)):
+                    if latency is None:
+                        scheduler.record(cmd, scheduler.cost[cmd], False)
+                        continue
+                    # Innerhalb eines Blocks zaehlt nur der Abstand zur Vorgaenger-Antwort
+                    previous = 0.0
+                    if pos % POLL_CHUNK and latencies[pos - 1] is not None:
+                        previous = latencies[pos - 1]
+                    scheduler.record(cmd, max(latency - previous, 0.0), bool(reply))
+                    if reply:
+                        self.update_value(cmd.decode('ascii').strip(';'), reply,
+                                          changed)
+            except (OSError, SerialException):
+                logger.exception('Polling error')
+                await self.reconnect()
+                # Baudrate kann sich nach der erneuten Suche geaendert haben
+                scheduler = None
             except Exception:
-                logger.exception('Failed to send update')
+                logger.exception('Polling error')
+            if (scheduler is not None
+                    and time.monotonic() - last_stats >= POLL_STATS_INTERVAL):
+                last_stats = time.monotonic()
+                logger.info('%s: Abfrageraten (Hz): %s', self.callsign,
+                            scheduler.refresh_rates())
+                logger.info('%s: Seriell-Thread: %s, max. Schleifenverzoegerung '
+                            '%.0f ms', self.callsign, self.worker.stats(),
+                            max_lag * 1000)
+                logger.info('%s: PTT-Latenz: %s', self.callsign,
+                            self.key_down_latency.summary())
+                logger.info('%s: Abstimmbefehle: %s', self.callsign,
+                            self.coalescer.stats())
+                max_lag = 0.0
+            if changed and send_func is not None:
+                try:
+                    await send_func(changed)
+                except Exception:
+                    logger.exception('Failed to send update')
+
+    async def send_snapshot(self, send_func):
+        """Zwischengespeicherten TRX-Zustand nach einer Neuverbindung senden."""
+        values = dict(self.startup_results)
+        values.update(self.last_values)
+        if values:
+            await send_func({'values': values})
+        if self.memory_channels:
+            await send_func({'memory_channels': self.memory_channels,
+                             'memory_details': self.memory_details})
+
+    async def refresh_memory_channels(self, send_func=None, channels=None):
+        """Speicherkanaele im Hintergrund neu lesen und Aenderungen melden.
+
+        Jeder gelesene Block wird mit dem bekannten Inhalt verglichen, nur
+        geaenderte Kanaele werden gesendet (``None`` fuer geloeschte). Bei
+        Aenderungen wird der Cache auf der Festplatte aktualisiert.
+        """
+        dirty = False
+
+        async def report(chunk):
+            nonlocal dirty
+            changed = {k: v for k, v in chunk.items()
+                       if self.memory_details.get(k) != v}
+            if not changed:
+                return
+            dirty = True
+            for key, value in changed.items():
+                if value is None:
+                    self.memory_details.pop(key, None)
+                else:
+                    self.memory_details[key] = value
+            self.memory_channels = self.memory_channel_list()
+            if send_func is not None:
+                try:
+                    await send_func({'memory_channels': self.memory_channels,
+                                     'memory_details': changed})
+                except Exception:
+                    logger.exception('Senden der Speicherliste fehlgeschlagen')
+
+        await self.read_memory_channels(report, channels)
+        if dirty:
+            save_memory_cache(self.callsign, self.memory_details)
+
+    async def upload_memories(self, channels, send_func=None):
+        """Mehrere Speicherkanaele in einem einzigen Schreibvorgang programmieren.
+
+        Ungueltige Eintraege werden uebersprungen. Anschliessend werden die
+        betroffenen Kanaele zur Kontrolle zurueckgelesen.
+        """
+        link = self.get_link()
+        if link is None or not isinstance(channels, list):
+            return
+        commands = []
+        numbers = []
+        for channel in channels:
+            command = format_memory_command(channel) if isinstance(channel, dict) else None
+            if command is None:
+                logger.warning('Ungueltiger Speicherkanal: %s', channel)
+                continue
+            commands.append(command)
+            numbers.append(int(channel['channel']))
+        if not commands:
+            return
+        try:
+            await self.worker.call(link.write, b''.join(commands),
+                                   priority=PRIORITY_OPERATOR)
+        except (OSError, SerialException):
+            logger.warning('Serial write failed during memory upload')
+            return
+        logger.info('%s: %d Speicherkanaele programmiert', self.callsign,
+                    len(commands))
+        await self.refresh_memory_channels(send_func, sorted(set(numbers)))
+
+    async def run_startup(self, send_func=None):
+        """Kaltstart: Starttests und Speicherscan schrittweise im Hintergrund.
+
+        Der Speicherinhalt aus dem Cache wird sofort gemeldet und danach
+        kanalweise mit dem TRX abgeglichen.
+        """
+        cached = load_memory_cache(self.callsign)
+        if cached:
+            self.memory_details.clear()
+            self.memory_details.update(cached)
+            self.memory_channels = self.memory_channel_list()
+            if send_func is not None:
+                await send_func({'memory_channels': self.memory_channels,
+                                 'memory_details': self.memory_details})
+        self.startup_results = await self.run_startup_tests(send_func)
+        await self.refresh_memory_channels(send_func)
+        self.startup_done = True
+
+    async def execute(self, data, received=None):
+        """Stell- und CAT-Befehl des Servers an den TRX weitergeben."""
+        cmd = data.get('command')
+        if cmd == 'set_frequency':
+            try:
+                self.coalescer.set_frequency(int(data['frequency']))
+            except (KeyError, ValueError):
+                pass
+            return
+        if cmd == 'cat' and data.get('data', '').rstrip(';') in ('EU', 'ED'):
+            self.coalescer.encoder(1 if data['data'].startswith('EU') else -1)
+            return
+        payload = None
+        if cmd == 'set_mode':
+            mode_code = normalize_mode_code(data.get('mode'))
+            if mode_code is not None:
+                payload = f'MD{mode_code};'
+        elif cmd == 'ptt_on':
+            payload = 'TX1;'
+        elif cmd == 'ptt_off':
+            payload = 'TX0;'
+        elif cmd == 'cat':
+            payload = data.get('data', '')
+            if not payload.endswith(';'):
+                payload += ';'
+        link = self.get_link()
+        if payload is None or link is None:
+            return
+        priority = PRIORITY_OPERATOR
+        if cmd in ('ptt_on', 'ptt_off'):
+            priority = PRIORITY_PTT
+        try:
+            await self.worker.call(link.write, payload.encode('ascii'),
+                                   priority=priority)
+        except (OSError, SerialException):
+            logger.warning('Serial write failed for command %s', cmd)
+        else:
+            if cmd == 'ptt_on' and received is not None:
+                self.key_down_latency.record(time.monotonic() - received)
+
+    async def cat_request(self, payload):
+        """CAT-Befehle senden und die Antworten der Abfragen liefern.
+
+        Reine Abfragen lesbarer Befehle werden mit ``query`` gestellt, ihre
+        Antworten aneinandergehaengt zurueckgegeben. Enthaelt ``payload``
+        Setzbefehle, wird nur geschrieben und ``None`` geliefert.
+        """
+        link = self.get_link()
+        if link is None:
+            return None
+        commands = [c.strip() for c in payload.split(';') if c.strip()]
+        if not commands:
+            return None
+        queries = [f'{c};'.encode('ascii') for c in commands]
+        if all(q in POLL_COMMANDS for q in queries):
+            replies = await self.worker.call(link.query, queries,
+                                             priority=PRIORITY_OPERATOR)
+            return ''.join(replies)
+        await self.worker.call(
+            link.write, ''.join(f'{c};' for c in commands).encode('ascii'),
+            priority=PRIORITY_OPERATOR)
+        return None
+
+
+def parse_rig_spec(spec):
+    """``PORT:CALLSIGN[:BAUD]`` aus ``--rig`` zerlegen.
+
+    Der Port darf selbst Doppelpunkte enthalten, getrennt wird von rechts.
+    """
+    parts = spec.rsplit(':', 2)
+    baud = None
+    if len(parts) == 3 and parts[2].isdigit():
+        baud = int(parts[2])
+        parts = parts[:2]
+    else:
+        parts = spec.rsplit(':', 1)
+    if len(parts) != 2 or not parts[0] or not parts[1]:
+        raise argparse.ArgumentTypeError(
+            f'Ungueltige TRX-Angabe {spec!r}, erwartet PORT:CALLSIGN[:BAUD]')
+    return parts[0], parts[1], baud
+
+
+# Kompaktes Binaerformat fuer Wertaenderungen (statt JSON), je Verbindung
+# ausgehandelt. Aufbau: Kennung, Rufzeichen (Laenge + UTF-8), Anzahl Felder,
+# je Feld: Feldnummer (255 = Name folgt), Typ und Wert. CAT-Antworten aus
+# Ziffern (``SM0123;``) werden als Stellenzahl plus Ganzzahl uebertragen.
+VALUE_FRAME_ID = 0xB1
+VALUE_FIELDS = [
+    'RTT', 'FA', 'FB', 'MD', 'SM', 'BY', 'TX', 'IF', 'OI', 'RM', 'AC', 'AG',
+    'AI', 'BC', 'BI', 'BP', 'CN', 'CO', 'CS', 'CT', 'DA', 'DT', 'EX', 'FS',
+    'FT', 'GT', 'ID', 'IS', 'KM', 'KP', 'KR', 'KS', 'LK', 'LM', 'MC', 'MG',
+    'ML', 'MR', 'MS', 'MT', 'MX', 'NA', 'NB', 'NL', 'NR', 'OS', 'PA', 'PB',
+    'PC', 'PL', 'PR', 'PS', 'RA', 'RG', 'RI', 'RL', 'RS', 'RT', 'SC', 'SD',
+    'SH', 'SQ', 'TS', 'UL', 'VD', 'VG', 'VX', 'XT',
+]
+VALUE_FIELD_IDS = {name: pos for pos, name in enumerate(VALUE_FIELDS)}
+VALUE_TEXT, VALUE_DIGITS, VALUE_INT, VALUE_NONE = range(4)
+
+
+def _put_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _put_text(out, text):
+    raw = text.encode('utf-8')
+    _put_varint(out, len(raw))
+    out += raw
+
+
+def encode_value_frame(callsign, values):
+    """Wertaenderungen eines TRX als Binaerrahmen kodieren.
 
-async def handle_client(websocket, announce=None, send_updates=False):
+    ``None``, wenn ein Wert weder Text noch Ganzzahl ist (dann JSON senden).
+    """
+    out = bytearray((VALUE_FRAME_ID,))
+    _put_text(out, callsign or '')
+    _put_varint(out, len(values))
+    for key, value in values.items():
+        field = VALUE_FIELD_IDS.get(key)
+        if field is None:
+            out.append(255)
+            _put_text(out, key)
+        else:
+            out.append(field)
+        if value is None:
+            out.append(VALUE_NONE)
+        elif isinstance(value, bool) or not isinstance(value, (int, str)):
+            return None
+        elif isinstance(value, int):
+            out.append(VALUE_INT)
+            _put_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        else:
+            digits = value[len(key):-1]
+            if (value.startswith(key) and value.endswith(';')
+                    and 0 < len(digits) <= 15 and digits.isdigit()
+                    and digits.isascii()):
+                out.append(VALUE_DIGITS)
+                out.append(len(digits))
+                _put_varint(out, int(digits))
+            else:
+                out.append(VALUE_TEXT)
+                _put_text(out, value)
+    return bytes(out)
+
+
+async def handle_client(websocket, rigs, announce=None, send_updates=False):
+    """Websocket-Verbindung zum Server fuer einen oder mehrere TRX bedienen.
+
+    Alle Meldungen tragen das Rufzeichen des TRX im Feld ``rig``, Befehle
+    ohne ``rig`` gelten dem ersten TRX. Traegt ein Befehl eine ``id``, wird
+    sie in der Antwort zurueckgegeben; solche Abfragen laufen nebenlaeufig,
+    damit mehrere gleichzeitig offen sein koennen.
+    """
+    connected = time.monotonic()
+    first_frequency = False
+    # Binaere Wertrahmen erst nach Zusage des Servers, sonst JSON
+    binary_values = False
     if announce is not None:
-        await websocket.send(json.dumps(announce))
-    if ser:
-        await run_startup_tests(lambda data: websocket.send(json.dumps(data)))
-        memories = await read_memory_channels()
-        if memories:
-            await websocket.send(json.dumps({'memory_channels': memories}))
-    poll_task = None
-    ping_task = None
-    if ser and send_updates:
-        poll_task = asyncio.create_task(
-            poll_trx(lambda vals: websocket.send(json.dumps({'values': vals}))))
+        await websocket.send(json.dumps(dict(announce, value_formats=['binary'])))
+    by_callsign = {r.callsign: r for r in rigs}
+
+    async def send_value_update(rig, values):
+        if binary_values:
+            frame = encode_value_frame(rig.callsign, values)
+            if frame is not None:
+                await websocket.send(frame)
+                return
+        await websocket.send(json.dumps({'values': values, 'rig': rig.callsign}))
+
+    def sender(rig):
+        async def send_json(data):
+            nonlocal first_frequency
+            if not first_frequency and 'FA' in data.get('values', {}):
+                first_frequency = True
+                logger.info('Erste Frequenz %.0f ms nach Verbindungsaufbau gesendet',
+                            (time.monotonic() - connected) * 1000)
+            if list(data) == ['values']:
+                await send_value_update(rig, data['values'])
+                return
+            await websocket.send(json.dumps(dict(data, rig=rig.callsign)))
+        return send_json
+
+    tasks = []
+    background = set()
+    for pos, rig in enumerate(rigs):
+        send_json = sender(rig)
+        if rig.ser and rig.startup_done:
+            # Warmstart: bekannten Zustand sofort senden, nur im Hintergrund auffrischen
+            await rig.send_snapshot(send_json)
+            tasks.append(asyncio.create_task(
+                rig.refresh_memory_channels(send_json)))
+        elif rig.ser:
+            # Kaltstart: Ergebnisse werden gemeldet, sobald sie vorliegen, waehrend
+            # Polling und Operator-Befehle bereits laufen
+            tasks.append(asyncio.create_task(rig.run_startup(send_json)))
+        if rig.ser and send_updates:
+            send_values = (lambda send: lambda vals: send({'values': vals}))(send_json)
+            if AUTO_INFO:
+                tasks.append(asyncio.create_task(
+                    rig.auto_info_reader(send_values)))
+                await rig.enable_auto_info()
+            # Pollzyklen der TRX gleichmaessig ueber die Periode verteilen
+            offset = SERIAL_POLLING * pos / len(rigs)
+            tasks.append(asyncio.create_task(
+                rig.poll(send_values, AUTO_INFO, offset)))
+
     async def ping_loop():
         while True:
             try:
@@ -372,67 +1758,119 @@ async def handle_client(websocket, announce=None, send_updates=False):
                 pong = await websocket.ping()
                 await pong
                 rtt = int((asyncio.get_event_loop().time() - start) * 1000)
-                await websocket.send(json.dumps({'values': {'RTT': rtt}}))
+                for rig in rigs:
+                    await send_value_update(rig, {'RTT': rtt})
             except Exception:
                 logger.exception('Ping failed')
                 break
             await asyncio.sleep(5)
-    ping_task = asyncio.create_task(ping_loop())
+    tasks.append(asyncio.create_task(ping_loop()))
+
+    async def confirm_loop():
+        # Alter der seit der letzten Meldung bestaetigten Werte in ms; der
+        # Server rechnet daraus den Bestaetigungszeitpunkt fuer max_age. Die
+        # erste Meldung umfasst auch die vor dem Verbindungsaufbau gelesenen.
+        last = 0.0
+        while True:
+            await asyncio.sleep(VALUE_CONFIRM_INTERVAL)
+            now = time.monotonic()
+            for rig in rigs:
+                confirmed = rig.confirmations(last)
+                if confirmed:
+                    ages = {key: round((now - stamp) * 1000)
+                            for key, stamp in confirmed.items()}
+                    await websocket.send(json.dumps({'rig': rig.callsign,
+                                                     'confirmed': ages}))
+            last = now
+    if send_updates:
+        tasks.append(asyncio.create_task(confirm_loop()))
+
+    def spawn(coro):
+        task = asyncio.create_task(coro)
+        background.add(task)
+        task.add_done_callback(background.discard)
+
+    async def answer(req_id, coro):
+        try:
+            reply = await coro
+        except (OSError, SerialException):
+            logger.warning('Serial access failed for request %s', req_id)
+            reply = None
+        response = {'response': reply}
+        if req_id is not None:
+            response['id'] = req_id
+        await websocket.send(json.dumps(response))
+
+    async def snapshot(rig, req_id, data):
+        async def progress(chunk, done, total):
+            await websocket.send(json.dumps({'id': req_id, 'progress': chunk,
+                                             'done': done, 'total': total}))
+        try:
+            timeout = float(data.get('timeout', SNAPSHOT_TIMEOUT))
+        except (TypeError, ValueError):
+            timeout = SNAPSHOT_TIMEOUT
+        await answer(req_id, rig.snapshot_answers(data.get('commands'),
+                                                  timeout, progress))
+
     try:
         async for message in websocket:
+            received = time.monotonic()
             data = json.loads(message)
+            if 'value_format' in data:
+                binary_values = data['value_format'] == 'binary'
+                logger.info('Wertformat: %s', data['value_format'])
+                continue
             cmd = data.get('command')
-            async with ser_lock:
-                if cmd == 'set_frequency':
-                    try:
-                        freq = int(data['frequency'])
-                        ser.write(f'FA{freq:011d};'.encode('ascii'))
-                    except (KeyError, ValueError):
-                        pass
-                elif cmd == 'set_mode':
-                    mode_code = normalize_mode_code(data.get('mode'))
-                    if mode_code is not None:
-                        ser.write(f'MD{mode_code};'.encode('ascii'))
-                elif cmd == 'ptt_on':
-                    ser.write(b'TX;')
-                elif cmd == 'ptt_off':
-                    ser.write(b'RX;')
-                elif cmd == 'cat':
-                    value = data.get('data', '')
-                    if not value.endswith(';'):
-                        value += ';'
-                    ser.write(value.encode('ascii'))
-                elif cmd == 'get_frequency':
-                    reply = LAST_VALUES.get('FA', LAST_FREQUENCY)
-                    if reply is None:
-                        ser.write(b'FA;')
-                        reply = ser.readline().decode('ascii', errors='ignore').strip()
-                    await websocket.send(json.dumps({'response': reply}))
-                elif cmd == 'get_mode':
-                    reply = LAST_VALUES.get('MD')
-                    if reply is None:
-                        ser.write(b'MD;')
-                        reply = ser.readline().decode('ascii', errors='ignore').strip()
-                    await websocket.send(json.dumps({'response': reply}))
-                elif cmd == 'get_smeter':
-                    reply = LAST_VALUES.get('SM')
-                    if reply is None:
-                        ser.write(b'SM;')
-                        reply = ser.readline().decode('ascii', errors='ignore').strip()
-                    await websocket.send(json.dumps({'response': reply}))
+            req_id = data.get('id')
+            # Ohne Angabe gilt der erste TRX; ein unbekannter Name darf nicht
+            # an einem anderen Geraet landen (PTT, Frequenz)
+            name = data.get('rig')
+            rig = rigs[0] if name is None else by_callsign.get(name)
+            if rig is None:
+                logger.warning('Befehl %s fuer unbekannten TRX %r verworfen',
+                               cmd, name)
+                response = {'response': None, 'rig': name,
+                            'error': f'Unbekannter TRX: {name}'}
+                if req_id is not None:
+                    response['id'] = req_id
+                await websocket.send(json.dumps(response))
+                continue
+            if cmd == 'upload_memories':
+                spawn(rig.upload_memories(data.get('channels'), sender(rig)))
+                if req_id is not None:
+                    await websocket.send(json.dumps({'id': req_id, 'response': None}))
+                continue
+            if cmd == 'snapshot_answers':
+                spawn(snapshot(rig, req_id, data))
+                continue
+            if cmd in ('get_frequency', 'get_mode', 'get_smeter'):
+                key = {'get_frequency': 'FA', 'get_mode': 'MD',
+                       'get_smeter': 'SM'}[cmd]
+                if req_id is None:
+                    await answer(None, rig.query_value(key))
+                else:
+                    spawn(answer(req_id, rig.query_value(key)))
+                continue
+            if (req_id is not None and cmd == 'cat'
+                    and data.get('data', '').rstrip(';') not in ('EU', 'ED')):
+                spawn(answer(req_id, rig.cat_request(data.get('data', ''))))
+                continue
+            await rig.execute(data, received)
+            if req_id is not None:
+                await websocket.send(json.dumps({'id': req_id, 'response': None}))
     finally:
-        if poll_task:
-            poll_task.cancel()
-            await asyncio.gather(poll_task, return_exceptions=True)
-        if ping_task:
-            ping_task.cancel()
-            await asyncio.gather(ping_task, return_exceptions=True)
-
-async def client_loop(uri, handshake):
+        for task in background:
+            task.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def client_loop(uri, handshake, rigs):
     while True:
         try:
             async with ws_connect(uri) as ws:
-                await handle_client(ws, announce=handshake, send_updates=True)
+                await handle_client(ws, rigs, announce=handshake,
+                                    send_updates=True)
         except asyncio.CancelledError:
             raise
         except Exception as exc:
@@ -440,52 +1878,657 @@ async def client_loop(uri, handshake):
             await asyncio.sleep(1)
 
 
-async def audio_loop(uri, handshake, input_dev=None, output_dev=None):
+# --- Audio-Codecs -----------------------------------------------------------
+# Alle Codecs arbeiten auf 16-Bit-PCM (little endian, mono, AUDIO_RATE).
+# audioop wird genutzt, falls vorhanden; sonst rechnen die reinen
+# Python-Varianten bitgleich nach (G.711 bzw. IMA-ADPCM wie audioop).
+
+_ADPCM_INDEX = [-1, -1, -1, -1, 2, 4, 6, 8] * 2
+_ADPCM_STEPS = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41,
+    45, 50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190,
+    209, 230, 253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724,
+    796, 876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272,
+    2499, 2749, 3024, 3327, 3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132,
+    7845, 8630, 9493, 10442, 11487, 12635, 13899, 15289, 16818, 18500,
+    20350, 22385, 24623, 27086, 29794, 32767,
+]
+_ADPCM_HEADER = struct.Struct('<hBx')  # Startwert, Schrittindex, Reserve
+_G711_TABLES = {}
+
+
+def _samples(pcm):
+    """PCM-Bytes als array('h') in Maschinenreihenfolge."""
+    samples = array('h')
+    samples.frombytes(pcm[:len(pcm) & ~1])
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
+
+
+def _pcm_bytes(samples):
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def _ulaw_encode_sample(sample):
+    value = sample >> 2
+    if value < 0:
+        value, mask = -value, 0x7F
+    else:
+        mask = 0xFF
+    value = min(value, 8159) + 33
+    seg = 0
+    while seg < 8 and value >= (0x40 << seg):
+        seg += 1
+    if seg >= 8:
+        return 0x7F ^ mask
+    return ((seg << 4) | ((value >> (seg + 1)) & 0x0F)) ^ mask
+
+
+def _ulaw_decode_sample(code):
+    code = ~code & 0xFF
+    value = (((code & 0x0F) << 3) + 0x84) << ((code & 0x70) >> 4)
+    return 0x84 - value if code & 0x80 else value - 0x84
+
+
+def _alaw_encode_sample(sample):
+    value = sample >> 3
+    if value >= 0:
+        mask = 0xD5
+    else:
+        mask = 0x55
+        value = -value - 1
+    seg = 0
+    while seg < 8 and value >= (0x20 << seg):
+        seg += 1
+    if seg >= 8:
+        return 0x7F ^ mask
+    shift = 1 if seg < 2 else seg
+    return ((seg << 4) | ((value >> shift) & 0x0F)) ^ mask
+
+
+def _alaw_decode_sample(code):
+    code ^= 0x55
+    value = (code & 0x0F) << 4
+    seg = (code & 0x70) >> 4
+    if seg == 0:
+        value += 8
+    else:
+        value = (value + 0x108) << (seg - 1)
+    return value if code & 0x80 else -value
+
+
+def _g711_tables(name):
+    """Kodier- (65536 Eintraege) und Dekodiertabelle einmalig aufbauen."""
+    tables = _G711_TABLES.get(name)
+    if tables is None:
+        if name == 'ulaw':
+            enc, dec = _ulaw_encode_sample, _ulaw_decode_sample
+        else:
+            enc, dec = _alaw_encode_sample, _alaw_decode_sample
+        encode = bytes(enc(s - 65536 if s > 32767 else s) for s in range(65536))
+        decode = array('h', (dec(c) for c in range(256)))
+        tables = _G711_TABLES[name] = (encode, decode)
+    return tables
+
+
+def adpcm_encode(pcm, state):
+    """IMA-ADPCM kodieren (erstes Sample im oberen Nibble wie audioop)."""
+    if audioop is not None:
+        return audioop.lin2adpcm(pcm, 2, state)
+    valpred, index = state
+    out = bytearray()
+    high = None
+    for sample in _samples(pcm):
+        step = _ADPCM_STEPS[index]
+        diff = sample - valpred
+        sign = 8 if diff < 0 else 0
+        if sign:
+            diff = -diff
+        delta = 0
+        vpdiff = step >> 3
+        if diff >= step:
+            delta = 4
+            diff -= step
+            vpdiff += step
+        step >>= 1
+        if diff >= step:
+            delta |= 2
+            diff -= step
+            vpdiff += step
+        step >>= 1
+        if diff >= step:
+            delta |= 1
+            vpdiff += step
+        valpred = valpred - vpdiff if sign else valpred + vpdiff
+        valpred = max(-32768, min(32767, valpred))
+        delta |= sign
+        index = max(0, min(88, index + _ADPCM_INDEX[delta]))
+        if high is None:
+            high = delta << 4
+        else:
+            out.append(high | delta)
+            high = None
+    return bytes(out), (valpred, index)
+
+
+def adpcm_decode(data, state):
+    """IMA-ADPCM dekodieren; Gegenstueck zu adpcm_encode()."""
+    if audioop is not None:
+        return audioop.adpcm2lin(data, 2, state)
+    valpred, index = state
+    step = _ADPCM_STEPS[index]
+    samples = array('h')
+    for byte in data:
+        for delta in (byte >> 4, byte & 0x0F):
+            index = max(0, min(88, index + _ADPCM_INDEX[delta]))
+            vpdiff = step >> 3
+            if delta & 4:
+                vpdiff += step
+            if delta & 2:
+                vpdiff += step >> 1
+            if delta & 1:
+                vpdiff += step >> 2
+            valpred = valpred - vpdiff if delta & 8 else valpred + vpdiff
+            valpred = max(-32768, min(32767, valpred))
+            step = _ADPCM_STEPS[index]
+            samples.append(valpred)
+    return _pcm_bytes(samples), (valpred, index)
+
+
+class PcmCodec:
+    """Unkomprimiertes PCM, Rueckfall fuer Gegenstellen ohne Codec-Auswahl."""
+
+    name = 'pcm'
+
+    def encode(self, pcm):
+        return pcm
+
+    def decode(self, data):
+        return data
+
+
+class G711Codec(PcmCodec):
+    """μ-law bzw. A-law: 8 Bit pro Sample, halbe Datenrate."""
+
+    def __init__(self, name='ulaw'):
+        self.name = name
+        if audioop is not None:
+            if name == 'ulaw':
+                self._encode, self._decode = audioop.lin2ulaw, audioop.ulaw2lin
+            else:
+                self._encode, self._decode = audioop.lin2alaw, audioop.alaw2lin
+
+    def encode(self, pcm):
+        if audioop is not None:
+            return self._encode(pcm, 2)
+        table = _g711_tables(self.name)[0]
+        samples = _samples(pcm)
+        return bytes(table[s & 0xFFFF] for s in samples)
+
+    def decode(self, data):
+        if audioop is not None:
+            return self._decode(data, 2)
+        table = _g711_tables(self.name)[1]
+        return _pcm_bytes(array('h', (table[c] for c in data)))
+
+
+class AdpcmCodec(PcmCodec):
+    """IMA-ADPCM: 4 Bit pro Sample, ein Viertel der PCM-Datenrate.
+
+    Jeder Rahmen beginnt mit dem Decoderzustand (Startwert, Schrittindex),
+    damit Hoerer mitten im Strom einsteigen koennen und verlorene Rahmen
+    keine Folgefehler erzeugen.
+    """
+
+    name = 'adpcm'
+
+    def __init__(self):
+        self.state = (0, 0)
+
+    def encode(self, pcm):
+        header = _ADPCM_HEADER.pack(*self.state)
+        data, self.state = adpcm_encode(pcm, self.state)
+        return header + data
+
+    def decode(self, data):
+        if len(data) < _ADPCM_HEADER.size:
+            return b''
+        state = _ADPCM_HEADER.unpack_from(data)
+        return adpcm_decode(data[_ADPCM_HEADER.size:], state)[0]
+
+
+class OpusCodec(PcmCodec):
+    """Opus ueber opuslib; mehrere 20-ms-Pakete je Nachricht, mit Laengenpraefix."""
+
+    name = 'opus'
+
+    def __init__(self):
+        self.encoder = opuslib.Encoder(AUDIO_RATE, CHANNELS, opuslib.APPLICATION_VOIP)
+        self.decoder = opuslib.Decoder(AUDIO_RATE, CHANNELS)
+        self.pending = b''
+
+    def encode(self, pcm):
+        self.pending += pcm
+        size = OPUS_FRAME * 2
+        out = bytearray()
+        while len(self.pending) >= size:
+            packet = self.encoder.encode(self.pending[:size], OPUS_FRAME)
+            self.pending = self.pending[size:]
+            out += struct.pack('<H', len(packet)) + packet
+        return bytes(out)
+
+    def decode(self, data):
+        pcm = bytearray()
+        pos = 0
+        while pos + 2 <= len(data):
+            length = struct.unpack_from('<H', data, pos)[0]
+            pos += 2
+            pcm += self.decoder.decode(bytes(data[pos:pos + length]), OPUS_FRAME)
+            pos += length
+        return bytes(pcm)
+
+
+AUDIO_CODECS = {
+    'pcm': PcmCodec,
+    'ulaw': lambda: G711Codec('ulaw'),
+    'alaw': lambda: G711Codec('alaw'),
+    'adpcm': AdpcmCodec,
+}
+if opuslib is not None:
+    AUDIO_CODECS['opus'] = OpusCodec
+
+
+def audio_codec_names():
+    """Verfuegbare Codecs in Vorzugsreihenfolge fuer den Audio-Handshake."""
+    return [name for name in AUDIO_CODEC_PREFERENCE if name in AUDIO_CODECS]
+
+
+def create_audio_codec(name):
+    """Codec-Instanz erzeugen; unbekannte Namen fallen auf PCM zurueck."""
+    factory = AUDIO_CODECS.get(name)
+    if factory is None:
+        logger.warning('Unknown audio codec %r, using pcm', name)
+        factory = PcmCodec
+    return factory()
+
+
+class AudioRing:
+    """Begrenzter Bytepuffer vom Aufnahme-Callback zur asyncio-Schleife.
+
+    Der Callback-Thread schreibt ohne zu warten; die Schleife wird ueber
+    ``call_soon_threadsafe`` geweckt. Laeuft der Puffer voll, werden die
+    aeltesten Daten verworfen (Overrun).
+    """
+
+    def __init__(self, capacity=AUDIO_RING_BYTES):
+        self.capacity = capacity
+        self._data = bytearray()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._event = None
+        self.overruns = 0
+        self.dropped_bytes = 0
+
+    def attach(self, loop):
+        """Fuer eine Verbindung in ``loop`` anmelden; alte Daten verwerfen.
+
+        Ueberlaeufe werden nur waehrend einer Verbindung gezaehlt.
+        """
+        with self._lock:
+            self._data.clear()
+            self._loop = loop
+            self._event = asyncio.Event()
+
+    def detach(self):
+        with self._lock:
+            self._loop = None
+            self._event = None
+
+    def write(self, data):
+        """Daten anhaengen, bei vollem Puffer die aeltesten verwerfen."""
+        with self._lock:
+            self._data += data
+            excess = len(self._data) - self.capacity
+            if excess > 0:
+                excess += excess & 1  # Samplegrenzen erhalten
+                del self._data[:excess]
+                if self._loop is not None:
+                    self.overruns += 1
+                    self.dropped_bytes += excess
+            loop, event = self._loop, self._event
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # Schleife bereits beendet
+                pass
+
+    async def read_async(self, size):
+        """Auf ``size`` Bytes warten, ohne die Schleife zu blockieren."""
+        while True:
+            with self._lock:
+                if len(self._data) >= size:
+                    chunk = bytes(self._data[:size])
+                    del self._data[:size]
+                    return chunk
+                event = self._event
+                event.clear()
+            await event.wait()
+
+    def count_overrun(self):
+        """Von PortAudio gemeldeten Ueberlauf mitzaehlen."""
+        with self._lock:
+            self.overruns += 1
+
+    def stats(self):
+        with self._lock:
+            return {'buffered_ms': round(len(self._data) * 1000
+                                         / (AUDIO_RATE * 2 * CHANNELS)),
+                    'overruns': self.overruns,
+                    'dropped_bytes': self.dropped_bytes}
+
+
+class JitterBuffer:
+    """Adaptiver Jitterpuffer fuer die TX-Wiedergabe (Operator-Mikrofon).
+
+    Die Ankunftszeiten der Rahmen liefern eine laufende Jitterschaetzung
+    (wie RTP, RFC 3550). Die Zielverzoegerung folgt ihr zwischen
+    ``target_ms`` und ``JITTER_MAX_MS``. Wiedergegeben wird erst, wenn der
+    Puffer das Ziel erreicht. Fehlt dann ein Rahmen, wird der letzte
+    gedaempft wiederholt und danach Stille eingefuegt. Wird der Puffer zu
+    tief, fallen die aeltesten Rahmen weg.
+    """
+
+    def __init__(self, target_ms=JITTER_TARGET_MS, max_ms=JITTER_MAX_MS):
+        self.base = target_ms / 1000
+        self.max_delay = max(max_ms, target_ms) / 1000
+        self._data = bytearray()
+        self._lock = threading.Lock()
+        self.reset()
+        self.late = 0
+        self.lost = 0
+        self.dropped = 0
+        self.underruns = 0
+
+    def reset(self):
+        """Zustand fuer eine neue Verbindung zuruecksetzen (Zaehler bleiben)."""
+        with self._lock:
+            self._data.clear()
+            self.jitter = 0.0
+            self.target = self.base
+            self.frame_bytes = CHUNK * 2 * CHANNELS
+            self._last_arrival = None
+            self._last_duration = 0.0
+            self._playing = False
+            self._last_chunk = None
+            self._concealed = 0
+
+    @staticmethod
+    def _seconds(size):
+        return size / (AUDIO_RATE * 2 * CHANNELS)
+
+    def write(self, pcm):
+        """Dekodierten Rahmen aus dem Netz uebernehmen."""
+        if not pcm:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._last_arrival is not None:
+                transit = now - self._last_arrival - self._last_duration
+                # Lange Pausen sind Sendepausen, kein Jitter
+                if abs(transit) < self.max_delay:
+                    self.jitter += (abs(transit) - self.jitter) / 16
+            self._last_arrival = now
+            self._last_duration = self._seconds(len(pcm))
+            self.frame_bytes = len(pcm)
+            self.target = min(self.max_delay, max(
+                self.base, self._last_duration + JITTER_FACTOR * self.jitter))
+            if self._concealed and self._playing:
+                # Zu spaet: sein Platz wurde schon verschleiert. Er wird
+                # trotzdem gespielt, der Puffer waechst dadurch nach.
+                self.late += 1
+                self._concealed = 0
+            self._data += pcm
+            limit = int(2 * self.target * AUDIO_RATE) * 2 * CHANNELS
+            if len(self._data) > limit + self.frame_bytes:
+                keep = int(self.target * AUDIO_RATE) * 2 * CHANNELS
+                excess = len(self._data) - keep
+                del self._data[:excess]
+                self.dropped += max(1, excess // self.frame_bytes)
+
+    def read(self, size):
+        """``size`` Bytes fuer den PortAudio-Callback liefern."""
+        with self._lock:
+            if not self._playing:
+                if self._seconds(len(self._data)) < self.target:
+                    return bytes(size)
+                self._playing = True
+                self._concealed = 0
+            if len(self._data) >= size:
+                chunk = bytes(self._data[:size])
+                del self._data[:size]
+                self._last_chunk = chunk
+                self._concealed = 0
+                return chunk
+            # Rahmen fehlt: Rest ausspielen, dann verschleiern
+            chunk = bytes(self._data)
+            self._data.clear()
+            self._concealed += 1
+            last = self._last_chunk
+            if self._concealed <= JITTER_REPEATS and last is not None:
+                self.lost += 1
+                self._last_chunk = _attenuate(last)
+                return (chunk + self._last_chunk)[:size].ljust(size, b'\0')
+            # Strom abgerissen: neu vorpuffern
+            self._playing = False
+            self._last_chunk = None
+            self._concealed = 0
+            return chunk.ljust(size, b'\0')
+
+    def count_underrun(self):
+        """Von PortAudio gemeldeten Unterlauf mitzaehlen."""
+        with self._lock:
+            self.underruns += 1
+
+    def stats(self):
+        with self._lock:
+            return {'depth_ms': round(self._seconds(len(self._data)) * 1000),
+                    'target_ms': round(self.target * 1000),
+                    'jitter_ms': round(self.jitter * 1000, 1),
+                    'late': self.late, 'lost': self.lost,
+                    'dropped': self.dropped, 'underruns': self.underruns}
+
+
+def _attenuate(pcm):
+    """PCM auf halbe Lautstaerke daempfen (fuer wiederholte Rahmen)."""
+    if audioop is not None:
+        return audioop.mul(pcm, 2, 0.5)
+    samples = _samples(pcm)
+    return _pcm_bytes(array('h', (value >> 1 for value in samples)))
+
+
+class SilenceGate:
+    """Pausenunterdrueckung fuer den RX-Audio-Uplink.
+
+    Ein Rahmen gilt als Signal, wenn sein RMS-Pegel ``threshold`` erreicht
+    und - falls ``busy`` angegeben ist - der Squelch des TRX offen ist
+    (``BY``). Nach dem letzten Signalrahmen bleibt die Sperre
+    ``hangover`` Sekunden offen. In Pausen wird statt Audio nur einmal ein
+    Stille-Marker mit dem Rauschpegel gesendet; der Browser erzeugt daraus
+    Komfortrauschen.
+    """
+
+    def __init__(self, threshold=VAD_THRESHOLD, hangover=VAD_HANGOVER, busy=None):
+        self.threshold = threshold
+        self.hangover = hangover
+        self.busy = busy
+        self.enabled = threshold > 0 or busy is not None
+        self.open_until = 0.0
+        self.silent = False
+        self.level = 0.0
+        self.sent = 0
+        self.suppressed = 0
+
+    def process(self, pcm):
+        """Liefert ``(senden, marker)``; ``marker`` ist ggf. vorher zu senden."""
+        if not self.enabled:
+            self.sent += 1
+            return True, None
+        rms = _rms(pcm)
+        now = time.monotonic()
+        signal = rms >= self.threshold and (
+            self.busy is None or self.busy() is not False)
+        if signal:
+            self.open_until = now + self.hangover
+        elif self.level:
+            # Rauschpegel fuer das Komfortrauschen langsam nachfuehren
+            self.level += (rms - self.level) / 8
+        else:
+            self.level = float(rms)
+        if now < self.open_until:
+            self.silent = False
+            self.sent += 1
+            return True, None
+        self.suppressed += 1
+        if self.silent:
+            return False, None
+        self.silent = True
+        return False, json.dumps({'silence': True, 'level': round(self.level)})
+
+    def stats(self):
+        total = self.sent + self.suppressed
+        return {'sent': self.sent, 'suppressed': self.suppressed,
+                'suppressed_share': round(self.suppressed / total, 3) if total else 0.0}
+
+
+def _rms(pcm):
+    if audioop is not None:
+        return audioop.rms(pcm, 2)
+    samples = _samples(pcm)
+    if not samples:
+        return 0
+    return int((sum(v * v for v in samples) / len(samples)) ** 0.5)
+
+
+async def audio_loop(uri, handshake, input_dev=None, output_dev=None,
+                     jitter_ms=JITTER_TARGET_MS, gate=None):
     if pyaudio is None:
         logger.error('pyaudio not installed, audio disabled')
         return
+    if gate is None:
+        gate = SilenceGate()
+    capture = AudioRing()
+    playback = JitterBuffer(jitter_ms)
+
+    # PortAudio ruft beide Funktionen aus eigenen Threads auf; sie duerfen
+    # nicht blockieren und reichen nur Daten in die Ringpuffer weiter
+    def capture_callback(in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            capture.count_overrun()
+        capture.write(in_data)
+        return (None, pyaudio.paContinue)
+
+    def playback_callback(in_data, frame_count, time_info, status):
+        if status & pyaudio.paOutputUnderflow:
+            playback.count_underrun()
+        return (playback.read(frame_count * 2 * CHANNELS), pyaudio.paContinue)
+
     try:
         p = pyaudio.PyAudio()
         in_stream = p.open(format=AUDIO_FORMAT, channels=CHANNELS,
                            rate=AUDIO_RATE, input=True, frames_per_buffer=CHUNK,
-                           input_device_index=input_dev)
+                           input_device_index=input_dev,
+                           stream_callback=capture_callback)
         out_stream = p.open(format=AUDIO_FORMAT, channels=CHANNELS,
                             rate=AUDIO_RATE, output=True, frames_per_buffer=CHUNK,
-                            output_device_index=output_dev)
+                            output_device_index=output_dev,
+                            stream_callback=playback_callback)
     except Exception:
         logger.exception('Audio initialization failed, disabling audio')
         return
-    while True:
-        try:
-            async with ws_connect(uri) as ws:
-                await ws.send(json.dumps(handshake))
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                async with ws_connect(uri) as ws:
+                    await ws.send(json.dumps(dict(handshake, codecs=audio_codec_names())))
+                    # Server antwortet mit dem gewaehlten Codec; aeltere Server
+                    # schweigen, dann bleibt es bei PCM
+                    name = 'pcm'
+                    first = None
+                    try:
+                        first = await asyncio.wait_for(ws.recv(), AUDIO_NEGOTIATE_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        pass
+                    if isinstance(first, str):
+                        try:
+                            name = json.loads(first).get('codec', name)
+                        except (ValueError, AttributeError):
+                            pass
+                        first = None
+                    encoder = create_audio_codec(name)
+                    decoder = create_audio_codec(name)
+                    logger.info('Audio codec: %s', encoder.name)
+                    capture.attach(loop)
+                    playback.reset()
+                    gate.silent = False  # Marker nach Neuverbindung erneut senden
+                    if first is not None:
+                        playback.write(decoder.decode(first))
 
-                async def sender():
-                    while True:
-                        data = in_stream.read(CHUNK, exception_on_overflow=False)
-                        await ws.send(data)
+                    async def sender():
+                        while True:
+                            data = await capture.read_async(CHUNK * 2 * CHANNELS)
+                            send, marker = gate.process(data)
+                            if marker:
+                                await ws.send(marker)
+                            if not send:
+                                continue
+                            payload = encoder.encode(data)
+                            if payload:
+                                await ws.send(payload)
 
-                async def receiver():
-                    async for msg in ws:
-                        out_stream.write(msg)
+                    async def receiver():
+                        async for msg in ws:
+                            if isinstance(msg, str):
+                                continue
+                            playback.write(decoder.decode(msg))
 
-                await asyncio.gather(sender(), receiver())
-        except asyncio.CancelledError:
-            raise
-        except Exception as exc:
-            logger.warning('Audio connection error (%s), retrying in 1 second', exc)
-            await asyncio.sleep(1)
+                    async def stats_loop():
+                        while True:
+                            await asyncio.sleep(AUDIO_STATS_INTERVAL)
+                            logger.info('Audio: Aufnahme %s, Wiedergabe %s, '
+                                        'Pausen %s', capture.stats(),
+                                        playback.stats(), gate.stats())
+
+                    await asyncio.gather(sender(), receiver(), stats_loop())
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning('Audio connection error (%s), retrying in 1 second', exc)
+                await asyncio.sleep(1)
+            finally:
+                capture.detach()
+    finally:
+        in_stream.close()
+        out_stream.close()
+        p.terminate()
 
 
 async def main():
-    global ser
     parser = argparse.ArgumentParser(description='FT-991A control server')
-    parser.add_argument('--serial-port', default=DEFAULT_SERIAL_PORT,
-                        help='FT-991A serial port')
-    parser.add_argument('--baudrate', type=int, default=DEFAULT_BAUDRATE,
-                        help='Serial baud rate')
+    parser.add_argument('--serial-port', default=None,
+                        help='FT-991A serial port (Standard: zuletzt '
+                             'gefundener Port, sonst automatische Suche)')
+    parser.add_argument('--baudrate', type=int, default=None,
+                        help='Serial baud rate (Standard: automatisch)')
     parser.add_argument('--callsign', default=DEFAULT_CALLSIGN,
                         help='Station callsign to announce')
+    parser.add_argument('--rig', action='append', type=parse_rig_spec,
+                        default=[], metavar='PORT:CALLSIGN[:BAUD]',
+                        help='Weiteren TRX bedienen (mehrfach angebbar). '
+                             'Ersetzt --serial-port/--callsign')
     parser.add_argument('--server', default=DEFAULT_CONNECT_URI,
                         help='Flask server ws(s)://host:port/ws/rig')
     parser.add_argument('--audio-server', default=DEFAULT_AUDIO_URI,
@@ -496,22 +2539,57 @@ async def main():
                         help='Audio output device index')
     parser.add_argument('--no-audio', action='store_true',
                         help='Audioubertragung deaktivieren')
+    parser.add_argument('--jitter-target', type=int, default=JITTER_TARGET_MS,
+                        help='Grundverzoegerung des Jitterpuffers fuer '
+                             'TX-Audio in ms (waechst bei Netzjitter)')
+    parser.add_argument('--vad-threshold', type=int, default=VAD_THRESHOLD,
+                        help='RMS-Schwelle, unter der RX-Audio als Pause '
+                             'nicht gesendet wird (0 = aus)')
+    parser.add_argument('--vad-squelch', action='store_true',
+                        help='RX-Audio nur bei offenem Squelch (BY) senden')
+    parser.add_argument('--encoder-step', type=int, default=ENCODER_STEP_HZ,
+                        help='Frequenzschritt pro Encoder-Befehl in Hz fest '
+                             'vorgeben (Standard: am TRX beobachten)')
+    parser.add_argument('--auto-info', action='store_true',
+                        help='Auto-Information (AI1;) des TRX nutzen statt '
+                             'alle Werte zu pollen')
     parser.add_argument('--username', default=None,
                         help='Username for login')
     parser.add_argument('--password', default=None,
                         help='Password for login')
     args = parser.parse_args()
 
-    global CALLSIGN
-    CALLSIGN = args.callsign
-    ser = None
-    try:
-        ser = open_serial_autodetect(args.serial_port, args.baudrate)
-    except SerialException:
-        print('Hinweis: Kein TRX gefunden, Dummy wird verwendet.', flush=True)
-        ser = DummySerial()
+    global AUTO_INFO, POLL_TIERS
+    AUTO_INFO = args.auto_info
+    if args.vad_squelch:
+        # Der Squelch-Status steuert die Audiopausen und muss daher so aktuell
+        # sein wie Frequenz und S-Meter (im AI-Modus meldet der TRX BY selbst)
+        POLL_TIERS = tuple((name, keys | {'BY'} if name == 'fast' else keys, interval)
+                           for name, keys, interval in POLL_TIERS)
+    rigs = []
+    if args.rig:
+        # Mehrere TRX: jeder Port wird nur fuer sich getestet
+        for port, callsign, baud in args.rig:
+            try:
+                ser_obj = discover_rig(port, baud, scan=False)
+            except SerialException:
+                print(f'Hinweis: Kein TRX an {port}, Dummy wird fuer '
+                      f'{callsign} verwendet.', flush=True)
+                ser_obj = DummySerial()
+            rigs.append(Rig(callsign, ser_obj, scan=False,
+                            step_hz=args.encoder_step))
+    else:
+        try:
+            ser_obj = discover_rig(args.serial_port, args.baudrate)
+        except SerialException:
+            print('Hinweis: Kein TRX gefunden, Dummy wird verwendet.', flush=True)
+            ser_obj = DummySerial()
+        rigs.append(Rig(args.callsign, ser_obj, step_hz=args.encoder_step))
+    callsign = rigs[0].callsign
     try:
-        handshake = {'callsign': CALLSIGN}
+        handshake = {'callsign': callsign}
+        if len(rigs) > 1:
+            handshake['callsigns'] = [r.callsign for r in rigs]
         if args.username and args.password:
             handshake.update({'username': args.username,
                               'password': args.password,
@@ -520,18 +2598,23 @@ async def main():
             logger.warning('No login credentials provided; connection may fail')
         audio_handshake = None
         if (args.username and args.password and not args.no_audio):
-            audio_handshake = {'callsign': CALLSIGN,
+            # Audio gibt es nur fuer den ersten TRX
+            audio_handshake = {'callsign': callsign,
                                'username': args.username,
                                'password': args.password,
                                'mode': 'trx_audio'}
-        tasks = [client_loop(args.server, handshake)]
+        tasks = [client_loop(args.server, handshake, rigs)]
         if audio_handshake:
+            gate = SilenceGate(
+                args.vad_threshold,
+                busy=rigs[0].is_busy if args.vad_squelch else None)
             tasks.append(audio_loop(args.audio_server, audio_handshake,
-                                   args.input_device, args.output_device))
+                                   args.input_device, args.output_device,
+                                   args.jitter_target, gate))
         await asyncio.gather(*tasks)
     finally:
-        if ser:
-            ser.close()
+        for rig in rigs:
+            rig.close()
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -71,6 +71,7 @@ class App:
         cfg = load_config()
 
         self.queue = Queue()
+        self.rig = None
         self.ws_thread = None
         self.stop_event = threading.Event()
 
@@ -247,12 +248,12 @@ class App:
         self.stop_event.set()
         if self.ws_thread and self.ws_thread.is_alive():
             self.ws_thread.join(timeout=1)
-        if trx.ser:
+        if self.rig:
             try:
-                trx.ser.close()
+                self.rig.close()
             except Exception:
                 pass
-            trx.ser = None
+            self.rig = None
         self.root.destroy()
 
     def poll_queue(self):
@@ -273,13 +274,12 @@ class App:
         asyncio.run(self.async_main(cfg))
 
     async def async_main(self, cfg):
-        trx.CALLSIGN = cfg['callsign']
         try:
-            baud = cfg.get('baudrate', trx.DEFAULT_BAUDRATE)
-            trx.ser = trx.open_serial_autodetect(cfg['serial_port'], baud)
+            ser_obj = trx.discover_rig(cfg['serial_port'], cfg.get('baudrate'))
         except SerialException:
             self.queue.put(('users', ['Dummy-TRX aktiv']))
-            trx.ser = trx.DummySerial()
+            ser_obj = trx.DummySerial()
+        self.rig = trx.Rig(cfg['callsign'], ser_obj)
         handshake = {
             'callsign': cfg['callsign'],
             'username': cfg['username'],
@@ -304,7 +304,7 @@ class App:
                     await asyncio.sleep(1)
 
         async def run_client():
-            await trx.client_loop(server_uri, handshake)
+            await trx.client_loop(server_uri, handshake, [self.rig])
 
         async def run_audio():
             audio_handshake = {